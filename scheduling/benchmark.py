@@ -0,0 +1,102 @@
+from common.input import Mode
+from common.table import ProcessTable, TrackTable, UnitTable
+from common.workloads import poisson_processes, disk_tracks
+from scheduling import _pop_flag, create_algorithms
+from typing import Dict, List
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import platform
+import json
+import sys
+
+DEFAULT_SIZES = [100,1000,10000,100000,1000000]
+
+def workloads(mode : Mode, size : int, seed : int) -> Dict[str,UnitTable]:
+    """ returns the named synthetic traces of the given size for the mode """
+    if mode == Mode.PROCESS:
+        # mean burst is 3, so the light trace keeps the cpu ~30% busy and the overloaded one builds deep ready queues
+        return {
+            "poisson-pareto-light" : ProcessTable(poisson_processes(size,seed,rate=0.1)),
+            "poisson-pareto-overload" : ProcessTable(poisson_processes(size,seed,rate=1.0)),
+        }
+    return {
+        pattern : TrackTable(disk_tracks(size,seed,pattern=pattern,high_track=9999))
+            for pattern in ["uniform","hotspot","sequential"]
+    }
+
+def benchmark(modes : List[Mode], sizes : List[int], seed : int = 0, quantum : int = 4, budget : float = 60, save_limit : int = 10000) -> List[dict]:
+    """ times simulation, schedule construction and saving for every algorithm, workload and size
+
+        Args:
+            modes(`List[Mode]`): which schedulers to run
+            sizes(`List[int]`): numbers of units, in increasing order
+            seed(`int`): seed of the workload generators
+            quantum(`int`): round robin quantum
+            budget(`float`): once a run of an algorithm takes longer than this many seconds, larger sizes of it are skipped
+            save_limit(`int`): saving is only timed for schedules with at most this many units, as the gantt chart grows 
+                with units times runs
+    """
+    results = []
+    over_budget = set()
+    with TemporaryDirectory() as tmp:
+        for mode in modes:
+            for size in sizes:
+                for (workload,table) in workloads(mode,size,seed).items():
+                    algorithms = create_algorithms(mode,quantum,0,9999,5000,1)
+                    for (name,a) in algorithms:
+                        result = {"mode" : mode.name.lower(), "workload" : workload, "algorithm" : name, "size" : size}
+                        results.append(result)
+                        if (mode,workload,name) in over_budget:
+                            result["skipped"] = True
+                            continue
+
+                        units = table.units()
+
+                        start = perf_counter()
+                        runs = a.simulate(units)
+                        result["simulate_s"] = perf_counter() - start
+
+                        start = perf_counter()
+                        schedule = a.create_schedule(runs)
+                        result["schedule_s"] = perf_counter() - start
+                        result["runs"] = len(schedule)
+
+                        if len(schedule.units) <= save_limit:
+                            start = perf_counter()
+                            schedule.save(tmp,"{}.csv".format(name))
+                            result["save_s"] = perf_counter() - start
+
+                        if result["simulate_s"] + result["schedule_s"] + result.get("save_s",0) > budget:
+                            over_budget.add((mode,workload,name))
+
+                        print("{} {} {} {}: {:.3f}s".format(mode.name.lower(),workload,name,size,result["simulate_s"]),file=sys.stderr)
+    return results
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+
+    try:
+        sizes = [int(float(x)) for x in _pop_flag(argv,"--sizes",",".join(map(str,DEFAULT_SIZES))).split(",")]
+        seed = int(_pop_flag(argv,"--seed",0))
+        quantum = int(_pop_flag(argv,"--quantum",4))
+        budget = float(_pop_flag(argv,"--budget",60))
+        save_limit = int(float(_pop_flag(argv,"--save-limit",10000)))
+        modes = [Mode[m.upper()] for m in _pop_flag(argv,"--modes","process,disk").split(",")]
+        out = _pop_flag(argv,"--out",None)
+    except (ValueError,KeyError):
+        print("usage: python3 benchmark.py [--sizes 100,1e3,...] [--modes process,disk] [--seed 0] [--quantum 4] [--budget seconds] [--save-limit units] [--out results.json]")
+        sys.exit(0)
+
+    report = {
+        "python" : platform.python_version(),
+        "machine" : platform.machine(),
+        "seed" : seed,
+        "quantum" : quantum,
+        "results" : benchmark(modes,sorted(sizes),seed,quantum,budget,save_limit)
+    }
+
+    if out:
+        with open(out,"w") as f:
+            json.dump(report,f,indent=1)
+    else:
+        json.dump(report,sys.stdout,indent=1)
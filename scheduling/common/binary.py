@@ -0,0 +1,116 @@
+from typing import Iterator, List, Sequence, Tuple
+from array import array
+from .table import ProcessTable, TrackTable, UnitTable
+import mmap
+import struct
+import sys
+
+# layout of binary files, all integers are 64 bit in the byte order of the machine which wrote the file:
+#   header: magic, version, kind (index into TABLE_TYPES), byte order, number of units, number of runs, start track
+#   one block per column of the unit table, holding that attribute of every unit
+#   for schedules, blocks of the start, end and unit index of every run
+#   the name table, the offset of every unit's utf-8 name into the name data and the end of the data, then the data
+# blocks are 8 byte aligned, so each one maps straight onto an array without copying
+
+# input traces
+TRACE = b"OSTR"
+# saved schedules
+SCHEDULE = b"OSSC"
+VERSION = 3
+HEADER = struct.Struct("=4sBBcxqqq")
+# table type of every kind of unit, in the order of the `Mode` enum
+TABLE_TYPES = [ProcessTable,TrackTable]
+RUN_COLUMNS = ["starts","ends","unit_idxs"]
+
+_BYTE_ORDER = b"<" if sys.byteorder == "little" else b">"
+
+class NameTable(Sequence):
+    def __init__(self, offsets : memoryview, data : memoryview) -> None:
+        """ read only list of names stored back to back, decoded as they are accessed
+
+            Args:
+                offsets(`memoryview`): start of every name in the data, followed by the end of the data
+                data(`memoryview`): utf-8 encoded names
+
+        """
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i : int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("name index out of range")
+        return str(self.data[self.offsets[i]:self.offsets[i+1]],"utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+def is_binary(path : str) -> bool:
+    """ whether the file is a binary trace or schedule rather than text """
+    with open(path,"rb") as f:
+        return f.read(4) in (TRACE,SCHEDULE)
+
+def write(path : str, magic : bytes, table : UnitTable, runs : Tuple[Sequence[int],Sequence[int],Sequence[int]] = ((),(),()), start : int = 0):
+    """ writes the units of the table, and the (start, end, unit index) columns of the runs of a schedule if given, to a binary file
+
+        Args:
+            path(`str`): file to write
+            magic(`bytes`): `TRACE` or `SCHEDULE`
+            table(`UnitTable`): the units, a `ProcessTable` or `TrackTable`
+            runs(`Tuple[Sequence[int],Sequence[int],Sequence[int]]`): start, end and unit index columns of the runs
+            start(`int`): track the head of a disk schedule starts at
+    """
+    encoded = [name.encode("utf-8") for name in table.names]
+    offsets = array('q',[0])
+    for name in encoded:
+        offsets.append(offsets[-1] + len(name))
+
+    with open(path,"wb") as f:
+        f.write(HEADER.pack(magic,VERSION,TABLE_TYPES.index(type(table)),_BYTE_ORDER,len(table),len(runs[0]),start))
+        for (c,_) in table.columns:
+            f.write(_as_array(table.base[c],'q').tobytes())
+        for column in runs:
+            f.write(_as_array(column,'q').tobytes())
+        f.write(offsets.tobytes())
+        f.write(b"".join(encoded))
+
+def read(path : str, magic : bytes) -> Tuple[UnitTable,List[memoryview],int]:
+    """ maps a binary file into memory, returns its unit table, its run columns (empty for traces) and the start track.
+        Nothing is copied, the columns and names are read straight from the mapped file, which stays open as long as they are used """
+    with open(path,"rb") as f:
+        mapped = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    if len(view) < HEADER.size:
+        raise ValueError("{}: not a binary file, too short".format(path))
+    (file_magic,version,kind,byte_order,units,runs,start) = HEADER.unpack_from(view)
+    if file_magic != magic:
+        raise ValueError("{}: expected a binary {} file".format(path,"trace" if magic == TRACE else "schedule"))
+    if version != VERSION or kind >= len(TABLE_TYPES):
+        raise ValueError("{}: unsupported binary file version {} or kind {}".format(path,version,kind))
+    if byte_order != _BYTE_ORDER:
+        raise ValueError("{}: binary file was written on a machine with a different byte order".format(path))
+
+    offset = HEADER.size
+    def block(length : int) -> memoryview:
+        nonlocal offset
+        if offset + 8 * length > len(view):
+            raise ValueError("{}: binary file is truncated".format(path))
+        column = view[offset:offset + 8 * length].cast('q')
+        offset += 8 * length
+        return column
+
+    table_type = TABLE_TYPES[kind]
+    base = {c:block(units) for (c,_) in table_type.columns}
+    run_columns = [block(runs) for _ in RUN_COLUMNS] if magic == SCHEDULE else []
+    offsets = block(units + 1)
+    names = NameTable(offsets,view[offset:])
+    return (table_type.from_columns(names,base),run_columns,start)
+
+def _as_array(column : Sequence[int], typecode : str) -> array:
+    return column if isinstance(column,array) and column.typecode == typecode else array(typecode,column)
@@ -0,0 +1,226 @@
+from typing import Dict, Optional, Tuple
+from .output import Schedule, load_schedule
+from functools import lru_cache
+from glob import glob
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+DEFAULT_CACHE_SIZE = 512 << 20
+# number of input files whose hashes are remembered
+MAX_REMEMBERED_FILES = 1024
+
+@lru_cache(maxsize=1)
+def cache_version() -> str:
+    """ sha256 of the source of the scheduler and its modules, part of every key, so any change to the code which could 
+        change the schedules or how they are stored invalidates the old entries without having to remember to """
+    here = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for path in [os.path.join(os.path.dirname(here),"scheduling.py")] + sorted(glob(os.path.join(here,"*.py"))):
+        digest.update(os.path.basename(path).encode("utf-8"))
+        try:
+            with open(path,"rb") as f:
+                digest.update(f.read())
+        except OSError:
+            pass
+    return digest.hexdigest()
+
+def default_cache_dir() -> str:
+    """ the per user cache directory, following the XDG convention """
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"),".cache"),"os-scripts")
+
+class ResultCache():
+    def __init__(self, path : str = None, max_bytes : int = DEFAULT_CACHE_SIZE) -> None:
+        """ on disk cache of schedules and their metrics, addressed by the content of the input file, the algorithm
+            and its parameters. Each entry is a binary schedule and a json file of its metrics, the least recently used
+            entries are evicted once the cache grows past its size limit
+
+            Args:
+                path(`str`): directory of the cache, created when needed, defaults to `default_cache_dir()`
+                max_bytes(`int`): size the cache is trimmed to once new entries take it past the limit
+
+        """
+        self.path = path or default_cache_dir()
+        self.max_bytes = max_bytes
+        # size of the cache when it was last listed plus the entries put since, None until it is first listed.
+        # Other processes may add entries too, so this can be low, and replaced entries are counted twice, so it can be high
+        self._size : int = None
+        # set once the cache directory could not be used, the cache then holds nothing and every run is simulated
+        self.disabled = False
+
+    def disable(self, error : OSError) -> None:
+        """ stops using the cache after it failed, warning once """
+        if not self.disabled:
+            print("not using the result cache in {}: {}".format(self.path,error),file=sys.stderr)
+        self.disabled = True
+
+    def file_hash(self, path : str) -> str:
+        """ sha256 of the content of the file, remembered by path, size and modification time so unchanged files are only read once.
+            If the file cannot be hashed the cache is disabled """
+        try:
+            return self._file_hash(path)
+        except OSError as e:
+            self.disable(e)
+            return ""
+
+    def _file_hash(self, path : str) -> str:
+        stat = os.stat(path)
+        real_path = os.path.realpath(path)
+        known = self._read_index().get(real_path)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+
+        file_hash = self._digest(path)
+        if not self.disabled:
+            # other processes may have remembered files while this one was hashed, so their entries are read again and kept
+            index = self._read_index()
+            # most recently hashed files last, only the latest ones are remembered
+            index.pop(real_path,None)
+            index[real_path] = [stat.st_size,stat.st_mtime_ns,file_hash]
+            while len(index) > MAX_REMEMBERED_FILES:
+                del index[next(iter(index))]
+            self._write(os.path.join(self.path,"hashes.json"),json.dumps(index).encode("utf-8"))
+        return file_hash
+
+    def _read_index(self) -> Dict[str,list]:
+        """ the remembered (size, modification time, hash) of input files by path """
+        try:
+            with open(os.path.join(self.path,"hashes.json")) as f:
+                return json.load(f)
+        except (OSError,ValueError):
+            return {}
+
+    @staticmethod
+    def _digest(path : str) -> str:
+        digest = hashlib.sha256()
+        with open(path,"rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20),b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def key(self, file_hash : str, mode : str, name : str, algorithm : object, params : tuple) -> str:
+        """ address of the schedule of the named algorithm with the given parameters on the input with the given hash """
+        identity = [cache_version(),file_hash,mode,name,type(algorithm).__qualname__,list(params)]
+        return hashlib.sha256(json.dumps(identity).encode("utf-8")).hexdigest()
+
+    def get(self, key : str) -> Optional[Tuple[Schedule,Dict]]:
+        """ returns the cached schedule and metrics, None if there are none """
+        metrics = self.get_metrics(key)
+        if metrics is None:
+            return None
+        try:
+            schedule = load_schedule(self._paths(key)[0])
+        except (OSError,ValueError):
+            return None
+        return (schedule,metrics)
+
+    def get_metrics(self, key : str) -> Optional[Dict]:
+        """ returns the cached metrics without loading the schedule, None if there are none """
+        if self.disabled:
+            return None
+        (schedule_path,metrics_path) = self._paths(key)
+        try:
+            with open(metrics_path) as f:
+                metrics = json.load(f)
+            # mark as recently used
+            os.utime(schedule_path)
+        except (OSError,ValueError):
+            return None
+        return metrics
+
+    def copy_schedule(self, key : str, path : str) -> bool:
+        """ copies the cached schedule, which is in the binary format, to the given file, returns whether it was cached """
+        if self.get_metrics(key) is None:
+            return False
+        try:
+            shutil.copyfile(self._paths(key)[0],path)
+        except OSError:
+            return False
+        return True
+
+    def put(self, key : str, schedule : Schedule, metrics : Dict) -> None:
+        """ stores the schedule and its metrics, then evicts the least recently used entries if the cache is over the size limit. 
+            The directory is only listed for the first entry and once the entries put since take the cache over the limit.
+            If the entry cannot be written the cache is disabled """
+        if self.disabled:
+            return
+        (schedule_path,metrics_path) = self._paths(key)
+        try:
+            os.makedirs(self.path,exist_ok=True)
+            (fd,tmp) = tempfile.mkstemp(dir=self.path,suffix=".tmp")
+            os.close(fd)
+            try:
+                schedule.save_binary(tmp)
+                os.replace(tmp,schedule_path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            self._write(metrics_path,json.dumps(metrics).encode("utf-8"))
+            added = os.path.getsize(schedule_path) + os.path.getsize(metrics_path)
+        except OSError as e:
+            self.disable(e)
+            return
+        if self._size is None:
+            self.evict()
+            return
+        self._size += added
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> None:
+        """ removes the least recently used entries until the cache fits in its size limit """
+        if self.disabled or not os.path.isdir(self.path):
+            return
+        entries = []
+        total = 0
+        try:
+            listing = list(os.scandir(self.path))
+        except OSError as e:
+            self.disable(e)
+            return
+        for entry in listing:
+            if not entry.name.endswith(".bin"):
+                continue
+            key = entry.name[:-4]
+            try:
+                stat = entry.stat()
+            except OSError:
+                # removed by another process
+                continue
+            size = stat.st_size
+            try:
+                size += os.path.getsize(self._paths(key)[1])
+            except OSError:
+                pass
+            entries.append((stat.st_mtime_ns,key,size))
+            total += size
+
+        entries.sort()
+        for (_,key,size) in entries:
+            if total <= self.max_bytes:
+                break
+            for p in self._paths(key):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
+        self._size = total
+
+    def _paths(self, key : str) -> Tuple[str,str]:
+        return (os.path.join(self.path,key + ".bin"),os.path.join(self.path,key + ".json"))
+
+    def _write(self, path : str, data : bytes) -> None:
+        # write to a temporary file first, so concurrent readers never see half an entry
+        os.makedirs(self.path,exist_ok=True)
+        (fd,tmp) = tempfile.mkstemp(dir=self.path,suffix=".tmp")
+        try:
+            with os.fdopen(fd,"wb") as f:
+                f.write(data)
+            os.replace(tmp,path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
@@ -0,0 +1,68 @@
+from typing import Iterable, List
+from heapq import heapify, heappop, heappush
+from .units import Unit
+
+
+class ArrivalQueue():
+    def __init__(self, units : List[Unit]) -> None:
+        """
+            Args:
+                units(`List[Unit]`): units yet to arrive, in any order
+            
+        """
+        # heap ordered by arrival time, ties broken by position in the input
+        self.heap = [(u.arrival_time, i, u) for (i,u) in enumerate(units)]
+        self.count = len(self.heap)
+        heapify(self.heap)
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def next_time(self) -> int:
+        """ returns the arrival time of the next unit to arrive """
+        return self.heap[0][0]
+
+    def push(self, unit : Unit) -> None:
+        """ adds a unit to arrive after those already in the queue """
+        heappush(self.heap,(unit.arrival_time,self.count,unit))
+        self.count += 1
+
+    def pop_arrived(self, time : int) -> List[Unit]:
+        """ removes and returns all units which arrived at or before the given time, in input order """
+        arrived = []
+        while self.heap and self.heap[0][0] <= time:
+            arrived.append(heappop(self.heap))
+
+        # the per-tick simulation added simultaneously arriving units in input order
+        arrived.sort(key=lambda a: a[1])
+        return [u for (_,_,u) in arrived]
+
+class ArrivalStream():
+    def __init__(self, units : Iterable[Unit]) -> None:
+        """
+            Args:
+                units(`Iterable[Unit]`): units yet to arrive, sorted by arrival time, consumed lazily 
+            
+        """
+        self.units = iter(units)
+        self.next = next(self.units,None)
+
+    def __bool__(self) -> bool:
+        return self.next is not None
+
+    def next_time(self) -> int:
+        """ returns the arrival time of the next unit to arrive """
+        return self.next.arrival_time
+
+    def pop_arrived(self, time : int) -> List[Unit]:
+        """ removes and returns all units which arrived at or before the given time, in input order """
+        arrived = []
+        while self.next is not None and self.next.arrival_time <= time:
+            arrived.append(self.next)
+            following = next(self.units,None)
+            if following is not None and following.arrival_time < self.next.arrival_time:
+                raise ValueError("arrival stream is not sorted, {} arrives at {} after {} at {}"
+                    .format(following,following.arrival_time,self.next,self.next.arrival_time))
+            self.next = following
+
+        return arrived
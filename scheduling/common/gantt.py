@@ -0,0 +1,233 @@
+from typing import List, Sequence, Tuple
+from html import escape
+from .optional import numpy
+
+# charts are drawn at a fixed size whatever the length of the schedule, runs are summed into time buckets of one
+# pixel column at most and units into a bounded number of rows, so neither the file nor the time to draw it grows with the runs
+
+# width in pixels of the plot area, also the most time buckets a chart is split into
+DEFAULT_WIDTH = 1200
+# most rows of a gantt chart, units are grouped into rows beyond this
+DEFAULT_MAX_ROWS = 200
+# height in pixels of the plot area of head movement plots, also the most buckets of requests they are split into
+DEFAULT_HEIGHT = 600
+ROW_HEIGHT = 14
+LABEL_WIDTH = 160
+AXIS_HEIGHT = 24
+# number of shades of busy time, a bucket in which a row runs for any time at all gets at least the lightest one
+LEVELS = 8
+# head positions are marked with dots up to this many requests
+MAX_MARKERS = 64
+
+def bucket_width(span : int, width : int) -> int:
+    """ the number of time units per bucket which fits the span into at most `width` buckets """
+    return max(1,-(-span // width))
+
+def occupancy(starts : Sequence[int], ends : Sequence[int], rows : Sequence[int], row_count : int, origin : int,
+        bucket : int, buckets : int) -> List[List[int]]:
+    """ time units each row spends running within every bucket (vectorized when numpy is available)
+
+        Args:
+            starts(`Sequence[int]`): start time of each run
+            ends(`Sequence[int]`): end time (inclusive) of each run
+            rows(`Sequence[int]`): row of each run
+            row_count(`int`): number of rows
+            origin(`int`): time the first bucket starts at
+            bucket(`int`): time units per bucket
+            buckets(`int`): number of buckets, covering every run
+    """
+    np = numpy()
+    if np is not None:
+        return _occupancy_numpy(starts,ends,rows,row_count,origin,bucket,buckets)
+    cells = [[0] * buckets for _ in range(row_count)]
+    for (a,b,r) in zip(starts,ends,rows):
+        a -= origin
+        e = b - origin + 1
+        row = cells[r]
+        first = a // bucket
+        last = (e - 1) // bucket
+        if first == last:
+            row[first] += e - a
+            continue
+        row[first] += (first + 1) * bucket - a
+        row[last] += e - last * bucket
+        for i in range(first + 1,last):
+            row[i] += bucket
+    return cells
+
+def _occupancy_numpy(starts, ends, rows, row_count, origin, bucket, buckets) -> List[List[int]]:
+    np = numpy()
+    a = np.asarray(starts,dtype=np.int64) - origin
+    e = np.asarray(ends,dtype=np.int64) - origin + 1
+    base = np.asarray(rows,dtype=np.int64) * buckets
+    first = a // bucket
+    last = (e - 1) // bucket
+    size = row_count * buckets
+
+    # the partial first and last bucket of every run, a run within one bucket is all first bucket
+    within = first == last
+    cells = np.bincount(base + first,weights=np.where(within,e - a,(first + 1) * bucket - a),minlength=size)
+    spans = ~within
+    cells += np.bincount(base[spans] + last[spans],weights=(e - last * bucket)[spans],minlength=size)
+
+    # the full buckets in between, as a difference array summed along each row
+    long = last > first + 1
+    full = np.bincount(base[long] + first[long] + 1,minlength=size) - np.bincount(base[long] + last[long],minlength=size)
+    full = np.cumsum(full.reshape(row_count,buckets),axis=1) * bucket
+    return (cells.reshape(row_count,buckets).round().astype(np.int64) + full).tolist()
+
+def envelope(values : Sequence[int], buckets : int) -> Tuple[int,List[Tuple[int,int,int,int]]]:
+    """ splits the values into at most the given number of chunks of equal length, returns the length of the chunks
+        and the first, smallest, largest and last value of every chunk, which are enough to draw a line through all
+        the values at the resolution of one chunk """
+    n = len(values)
+    chunk = max(1,-(-n // buckets))
+    np = numpy()
+    if np is not None and n:
+        values = np.asarray(values,dtype=np.int64)
+        idxs = np.arange(0,n,chunk)
+        lasts = np.minimum(idxs + chunk,n) - 1
+        return (chunk,list(zip(values[idxs].tolist(),np.minimum.reduceat(values,idxs).tolist(),
+            np.maximum.reduceat(values,idxs).tolist(),values[lasts].tolist())))
+    values = list(values)
+    chunks = []
+    for i in range(0,n,chunk):
+        part = values[i:i + chunk]
+        chunks.append((part[0],min(part),max(part),part[-1]))
+    return (chunk,chunks)
+
+def row_color(row : int) -> str:
+    """ colour of a row, hues a golden angle apart so neighbouring rows stand out """
+    return "hsl({:.0f},65%,45%)".format((row * 137.508) % 360)
+
+def _ticks(low : int, high : int, count : int = 10) -> List[int]:
+    """ round values between low and high inclusive, about `count` of them """
+    span = max(high - low,1)
+    step = 1
+    while span / step > count:
+        for m in (2,5,10):
+            if span / (step * m) <= count:
+                step *= m
+                break
+        else:
+            step *= 10
+    return list(range(-(-low // step) * step,high + 1,step))
+
+def render_gantt(starts : Sequence[int], ends : Sequence[int], rows : Sequence[int], labels : List[str],
+        width : int = DEFAULT_WIDTH, units : Sequence[int] = None, names : List[str] = None) -> str:
+    """ draws the runs as an svg gantt chart with a row per label. Up to `width` runs are drawn one by one, coloured by unit
+        and named by a tooltip. Beyond that the time of the schedule is split into at most `width` buckets, each drawn 
+        shaded by the share of it the row spent running, and neighbouring buckets of the same shade are merged, 
+        so the chart stays the same size however long the schedule
+
+        Args:
+            starts(`Sequence[int]`): start time of each run
+            ends(`Sequence[int]`): end time (inclusive) of each run
+            rows(`Sequence[int]`): row of each run, an index into the labels
+            labels(`List[str]`): name of every row
+            width(`int`): width of the plot area in pixels
+            units(`Sequence[int]`): unit of each run, which picks its colour when runs are drawn one by one, the row if not given
+            names(`List[str]`): name of every unit, shown over its runs when they are drawn one by one
+    """
+    origin = min(starts,default=0)
+    end = max(ends,default=origin) + 1
+    bucket = bucket_width(end - origin,width)
+    buckets = -(-(end - origin) // bucket)
+    scale = width / buckets
+
+    height = AXIS_HEIGHT + ROW_HEIGHT * len(labels)
+    out = ['<svg xmlns="http://www.w3.org/2000/svg" width="{}" height="{}" font-family="sans-serif" font-size="10">'.format(
+        LABEL_WIDTH + width + 10,height + 4)]
+    for t in _ticks(origin,end):
+        x = LABEL_WIDTH + (t - origin) / bucket * scale
+        out.append('<line x1="{0:.2f}" y1="{1}" x2="{0:.2f}" y2="{2}" stroke="#ddd"/><text x="{0:.2f}" y="{3}" text-anchor="middle">{4}</text>'.format(
+            x,AXIS_HEIGHT - 4,height,AXIS_HEIGHT - 8,t))
+    for (r,label) in enumerate(labels):
+        y = AXIS_HEIGHT + r * ROW_HEIGHT
+        out.append('<text x="{}" y="{}" text-anchor="end">{}</text>'.format(LABEL_WIDTH - 4,y + ROW_HEIGHT - 3,escape(label)))
+
+    if len(starts) <= width:
+        units = rows if units is None else units
+        for (a,b,r,u) in zip(starts,ends,rows,units):
+            title = '<title>{} {}-{}</title>'.format(escape(names[u]),a,b) if names is not None else ''
+            out.append('<rect x="{:.2f}" y="{}" width="{:.2f}" height="{}" fill="{}">{}</rect>'.format(
+                LABEL_WIDTH + (a - origin) / bucket * scale,AXIS_HEIGHT + r * ROW_HEIGHT + 1,(b - a + 1) / bucket * scale,
+                ROW_HEIGHT - 2,row_color(u),title))
+        out.append('</svg>')
+        return "\n".join(out)
+
+    cells = occupancy(starts,ends,rows,len(labels),origin,bucket,buckets)
+    for (r,row) in enumerate(cells):
+        y = AXIS_HEIGHT + r * ROW_HEIGHT
+        out.append('<g fill="{}">'.format(row_color(r)))
+        # runs of buckets with the same shade, each drawn once
+        i = 0
+        while i < buckets:
+            level = -(-row[i] * LEVELS // bucket)
+            j = i + 1
+            while j < buckets and -(-row[j] * LEVELS // bucket) == level:
+                j += 1
+            if level:
+                opacity = '' if level >= LEVELS else ' fill-opacity="{:.3f}"'.format(level / LEVELS)
+                out.append('<rect x="{:.2f}" y="{}" width="{:.2f}" height="{}"{}/>'.format(
+                    LABEL_WIDTH + i * scale,y + 1,(j - i) * scale,ROW_HEIGHT - 2,opacity))
+            i = j
+        out.append('</g>')
+    out.append('</svg>')
+    return "\n".join(out)
+
+def render_head_movements(positions : Sequence[int], width : int = DEFAULT_WIDTH, height : int = DEFAULT_HEIGHT) -> str:
+    """ draws the tracks visited by the head as an svg plot, tracks across and requests in the order they were served
+        going down. Requests are split into at most `height` chunks, each drawn as the line through its first,
+        lowest, highest and last track, so long schedules keep their shape at a bounded size
+
+        Args:
+            positions(`Sequence[int]`): track of the head before the first request and after every request
+            width(`int`): width of the plot area in pixels
+            height(`int`): height of the plot area in pixels
+    """
+    low = min(positions,default=0)
+    high = max(max(positions,default=0),low + 1)
+    (chunk,chunks) = envelope(positions,height)
+    x_scale = width / (high - low)
+    y_scale = height / max(len(chunks) - 1,1)
+
+    points = []
+    for (i,(first,lo,hi,last)) in enumerate(chunks):
+        y = i * y_scale
+        if chunk == 1:
+            points.append((first,y))
+            continue
+        # the turning points in the order the head most likely passed them
+        (a,b) = (hi,lo) if first > last else (lo,hi)
+        points.extend([(first,y),(a,y),(b,y),(last,y)])
+
+    out = ['<svg xmlns="http://www.w3.org/2000/svg" width="{}" height="{}" font-family="sans-serif" font-size="10">'.format(
+        LABEL_WIDTH + width + 10,AXIS_HEIGHT + height + 10)]
+    for t in _ticks(low,high):
+        x = LABEL_WIDTH + (t - low) * x_scale
+        out.append('<line x1="{0:.2f}" y1="{1}" x2="{0:.2f}" y2="{2}" stroke="#ddd"/><text x="{0:.2f}" y="{3}" text-anchor="middle">{4}</text>'.format(
+            x,AXIS_HEIGHT - 4,AXIS_HEIGHT + height,AXIS_HEIGHT - 8,t))
+    out.append('<text x="{}" y="{}" text-anchor="end">request 0</text>'.format(LABEL_WIDTH - 4,AXIS_HEIGHT + 3))
+    out.append('<text x="{}" y="{}" text-anchor="end">request {}</text>'.format(LABEL_WIDTH - 4,AXIS_HEIGHT + height + 3,max(len(positions) - 1,0)))
+    out.append('<polyline fill="none" stroke="{}" stroke-width="1.5" points="{}"/>'.format(row_color(0)," ".join(
+        "{:.2f},{:.2f}".format(LABEL_WIDTH + (t - low) * x_scale,AXIS_HEIGHT + y) for (t,y) in points)))
+    if len(positions) <= MAX_MARKERS:
+        out.append('<g fill="{}">'.format(row_color(0)))
+        for (t,y) in points:
+            out.append('<circle cx="{:.2f}" cy="{:.2f}" r="2.5"/>'.format(LABEL_WIDTH + (t - low) * x_scale,AXIS_HEIGHT + y))
+        out.append('</g>')
+    out.append('</svg>')
+    return "\n".join(out)
+
+def to_html(svg : str, title : str, description : str = "") -> str:
+    """ wraps an svg chart in a standalone html page """
+    return "\n".join([
+        '<!DOCTYPE html>',
+        '<html><head><meta charset="utf-8"><title>{}</title></head>'.format(escape(title)),
+        '<body style="font-family:sans-serif">',
+        '<h3>{}</h3>'.format(escape(title)),
+        '<p>{}</p>'.format(escape(description)) if description else '',
+        svg,
+        '</body></html>',
+    ])
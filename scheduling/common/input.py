@@ -1,8 +1,11 @@
-
-
-from typing import List
+from typing import Iterator, List, Tuple
+from array import array
 from enum import Enum
 from .units import Process, Unit, Track
+from .table import ProcessTable, TrackTable, UnitTable
+from . import binary
+import csv
+import re
 
 
 class Mode(Enum):
@@ -11,20 +14,126 @@ class Mode(Enum):
     PAGE = 2
 
 class Reader():
-    def __init__(self) -> None:
-        pass
+    def __init__(self, buffer_size : int = 1 << 20) -> None:
+        """
+            Args:
+                buffer_size(`int`): size of the read buffer used when streaming files
+            
+        """
+        self.buffer_size = buffer_size
 
     def read(self,mode : Mode, path : str ) -> List[Unit]:
-        with open(path,"r") as f:
-            creator = None 
+        """ reads all units in the file, in file order """
+        return [u for (_,u) in self._rows(mode,path)]
+
+    def read_table(self, mode : Mode, path : str) -> UnitTable:
+        """ reads all units in the file into a columnar table, in file order. 
+            Binary traces are mapped into memory instead of being parsed """
+        if binary.is_binary(path):
+            return self._binary_table(mode,path)
+        table = ProcessTable() if mode == Mode.PROCESS else TrackTable()
+        for (_,u) in self._rows(mode,path):
+            table.append(u)
+        return table
+
+    def stream(self, mode : Mode, path : str) -> Iterator[Unit]:
+        """ lazily yields the units in the file, which must be sorted by arrival time, 
+            can be passed straight to `SchedulingAlgorithm.schedule` as an arrival stream """
+        last = None
+        for (line,u) in self._rows(mode,path):
+            if last is not None and u.arrival_time < last.arrival_time:
+                raise ValueError("{}:{}: unit {} arrives at {}, before the previous unit {} at {}, streamed files must be sorted by arrival time"
+                    .format(path,line,u,u.arrival_time,last,last.arrival_time))
+            last = u
+            yield u
+
+    def references(self, path : str) -> Iterator[int]:
+        """ lazily yields the pages of a reference string file, in which page numbers are separated by commas, 
+            whitespace or newlines, a leading header word is skipped. The file is read in chunks of the buffer size, 
+            so reference strings of any length can be streamed """
+        first = True
+        rest = ""
+        with open(path,"r",buffering=self.buffer_size) as f:
+            while True:
+                chunk = f.read(self.buffer_size)
+                tokens = _SEPARATORS.split(rest + chunk)
+                # the last token may continue in the next chunk
+                rest = tokens.pop() if chunk else ""
+                if first and tokens and tokens[0] == "":
+                    tokens = tokens[1:]
+                if first and tokens:
+                    first = False
+                    if not _is_int(tokens[0]):
+                        tokens = tokens[1:]
+                try:
+                    yield from map(int,filter(None,tokens))
+                except ValueError as e:
+                    raise ValueError("{}: malformed page reference: {}".format(path,e)) from None
+                if not chunk:
+                    return
+
+    def read_references(self, path : str) -> array:
+        """ reads the whole reference string of the file into an array of page numbers """
+        return array('q',self.references(path))
+
+    def convert(self, mode : Mode, path : str, binary_path : str) -> int:
+        """ converts a csv file to a binary trace which loads without parsing, returns the number of units """
+        table = self.read_table(mode,path)
+        binary.write(binary_path,binary.TRACE,table)
+        return len(table)
+
+    def _binary_table(self, mode : Mode, path : str) -> UnitTable:
+        (table,_,_) = binary.read(path,binary.TRACE)
+        expected = ProcessTable if mode == Mode.PROCESS else TrackTable
+        if not isinstance(table,expected):
+            raise ValueError("{}: binary trace holds {} units, not {} units".format(path,"disk" if isinstance(table,TrackTable) else "process",mode.name.lower()))
+        return table
+
+    def _rows(self, mode : Mode, path : str) -> Iterator[Tuple[int,Unit]]:
+        """ lazily parses (line number, unit) pairs line by line, skipping blank lines and a header line, 
+            raises `ValueError` with the line number on malformed lines. 
+            The units of binary traces are numbered by record instead """
+        if mode in (Mode.PROCESS,Mode.DISK) and binary.is_binary(path):
+            yield from enumerate(self._binary_table(mode,path).units(),1)
+            return
+
+        creator = None 
+        fields = 0
+
+        if mode == Mode.PROCESS:
+            creator = Process.from_fields
+            fields = 4
+        elif mode == Mode.DISK:
+            creator = Track.from_fields
+            fields = 3
+        else:
+            raise ValueError("cannot read scheduling units for mode {}".format(mode))
+
+        with open(path,"r",newline="",buffering=self.buffer_size) as f:
+            seen_unit = False
+            reader = csv.reader(f)
+            for row in reader:
+                if not row or all(not x.strip() for x in row):
+                    continue 
+
+                try:
+                    if len(row) < fields:
+                        raise ValueError("expected {} fields but got {}".format(fields,len(row)))
+                    unit = creator(row)
+                except ValueError as e:
+                    # the first line may name the columns 
+                    if not seen_unit and not any(_is_int(x) for x in row[1:]):
+                        continue
+                    raise ValueError("{}:{}: malformed line {}: {}".format(path,reader.line_num,",".join(row),e)) from None
 
-            if mode == Mode.PROCESS:
-                creator = lambda str : Process.parse(str)
-            elif mode == Mode.DISK:
-                creator = lambda str : Track.parse(str)
-            units = []
-            for l in f.readlines():
-                units.append(creator(l))
+                seen_unit = True
+                yield (reader.line_num,unit)
 
-            return units
+_SEPARATORS = re.compile(r"[\s,]+")
 
+def _is_int(field : str) -> bool:
+    try:
+        int(field)
+        return True
+    except ValueError:
+        return False
@@ -0,0 +1,271 @@
+from typing import Dict, List, Optional, Sequence
+from .optional import numpy
+
+
+class ScheduleMetrics():
+    def __init__(self, arrival_times : Sequence[int], starts : Sequence[int], ends : Sequence[int], unit_idxs : Sequence[int]) -> None:
+        """ per unit metrics of a schedule, worked out in a single pass over its runs (vectorized when numpy is available),
+            every list is indexed by unit index
+
+            Args:
+                arrival_times(`Sequence[int]`): arrival time of each unit
+                starts(`Sequence[int]`): start time of each run, in time order
+                ends(`Sequence[int]`): end time (inclusive) of each run
+                unit_idxs(`Sequence[int]`): unit index of each run
+            
+        """
+        if numpy() is not None:
+            (completion,burst,first_start) = _fold_numpy(len(arrival_times),starts,ends,unit_idxs)
+        else:
+            (completion,burst,first_start) = _fold(len(arrival_times),starts,ends,unit_idxs)
+
+        self.completion_times : List[int] = completion
+        self.burst_times : List[int] = burst
+        self.turnaround_times : List[int] = [c - a + 1 for (c,a) in zip(completion,arrival_times)]
+        self.wait_times : List[int] = [t - b for (t,b) in zip(self.turnaround_times,burst)]
+        self.response_times : List[int] = [s - a for (s,a) in zip(first_start,arrival_times)]
+
+        n = len(arrival_times)
+        self.avg_turnaround_time = sum(self.turnaround_times) / n if n else 0
+        self.avg_wait_time = sum(self.wait_times) / n if n else 0
+        self.avg_response_time = sum(self.response_times) / n if n else 0
+
+# percentiles reported by `distribution`
+PERCENTILES = (50,90,95,99)
+
+def distribution(values : Sequence[int]) -> Dict[str,float]:
+    """ count, mean, nearest rank percentiles and maximum of the values (vectorized when numpy is available), 
+        all zero if there are none """
+    n = len(values)
+    if n == 0:
+        return {"count" : 0, "mean" : 0, **{"p{}".format(p) : 0 for p in PERCENTILES}, "max" : 0}
+    np = numpy()
+    if np is not None:
+        ordered = np.sort(np.asarray(values,dtype=np.int64))
+        mean = float(ordered.mean())
+    else:
+        ordered = sorted(values)
+        mean = sum(ordered) / n
+    # the smallest value with at least p percent of the values at or below it
+    stats = {"count" : n, "mean" : mean}
+    for p in PERCENTILES:
+        stats["p{}".format(p)] = int(ordered[max(0,-(-p * n // 100) - 1)])
+    stats["max"] = int(ordered[-1])
+    return stats
+
+# significant bits kept by `QuantileSketch`, quantiles are within 1 / 2^(precision - 1) of the true value
+DEFAULT_PRECISION = 7
+
+class QuantileSketch():
+    __slots__ = ("precision","buckets","count","total","min","max")
+
+    def __init__(self, precision : int = DEFAULT_PRECISION) -> None:
+        """ mergeable histogram of non negative integers, in the style of an HDR histogram. Values below 2^precision have 
+            a bucket each, larger ones share a bucket with the values of the same leading `precision` bits, so quantiles 
+            are exact for small values and within a relative error of 1 / 2^(precision - 1) otherwise, and the sketch 
+            never holds more than 2^(precision - 1) buckets per power of two however many values are added.
+            Sketches with the same precision can be merged, giving the sketch of all their values
+
+            Args:
+                precision(`int`): significant bits of the values kept, at least 1
+            
+        """
+        if precision < 1:
+            raise ValueError("the precision must be at least 1 bit, not {}".format(precision))
+        self.precision = precision
+        # bucket key -> number of values
+        self.buckets : Dict[int,int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value : int, count : int = 1) -> None:
+        """ adds the value the given number of times, raises `ValueError` if it is negative """
+        if value < 0:
+            raise ValueError("sketches hold non negative values, not {}".format(value))
+        shift = value.bit_length() - self.precision
+        # the shift above the exact range followed by the leading bits, which orders keys like their values
+        key = value if shift <= 0 else (shift << self.precision) | (value >> shift)
+        self.buckets[key] = self.buckets.get(key,0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other : "QuantileSketch") -> "QuantileSketch":
+        """ adds the values of the other sketch to this one, returns this sketch """
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches of {} and {} bits of precision".format(self.precision,other.precision))
+        for (key,count) in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key,0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def quantile(self, p : float) -> int:
+        """ the nearest rank p'th percentile, the middle of its bucket for values which are not held exactly, 0 if the sketch is empty """
+        if self.count == 0:
+            return 0
+        rank = max(1,-(-p * self.count // 100))
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen >= rank:
+                break
+        shift = (key >> self.precision) if key >= (1 << self.precision) else 0
+        if shift == 0:
+            return key
+        low = (key & ((1 << self.precision) - 1)) << shift
+        return min(max(low + ((1 << shift) - 1) // 2,self.min),self.max)
+
+    def summary(self) -> Dict[str,float]:
+        """ count, mean, percentiles and maximum of the values, in the same form as `distribution` """
+        if self.count == 0:
+            return distribution(())
+        stats = {"count" : self.count, "mean" : self.total / self.count}
+        for p in PERCENTILES:
+            stats["p{}".format(p)] = self.quantile(p)
+        stats["max"] = self.max
+        return stats
+
+# metrics kept by `MetricsCollector` for every completed unit
+LATENCY_METRICS = ("turnaround time","wait time","response time")
+
+class MetricsCollector():
+    def __init__(self, precision : int = DEFAULT_PRECISION) -> None:
+        """ metrics of a simulation collected while it runs, the simulation reports every run (see `ran`) and every unit 
+            as it completes (see `complete`). Turnaround, wait and response times go into a `QuantileSketch` per priority, 
+            so memory is bounded by the units in the system at once and the number of priorities rather than by the length 
+            of the trace, next to the number of completed units, context switches and busy time.
+            Collectors of separate simulations (e.g. of the parts of a trace, or run in worker processes) can be merged
+
+            Args:
+                precision(`int`): precision of the sketches, see `QuantileSketch`
+            
+        """
+        self.precision = precision
+        # priority (None for units without one) -> metric -> sketch
+        self.groups : Dict[Optional[int],Dict[str,QuantileSketch]] = {}
+        self.completed = 0
+        self.context_switches = 0
+        # time units spent running units
+        self.busy_time = 0
+        self.first_arrival : int = None
+        self.last_completion : int = None
+        # state of every unit which has run but not completed -> [first start, time units run]
+        self._live = {}
+
+    def ran(self, state, start : int, ticks : int) -> None:
+        """ records that the unit (its `UnitState`) ran for the given number of time units from the given time """
+        live = self._live.get(state)
+        if live is None:
+            self._live[state] = [start,ticks]
+        else:
+            live[1] += ticks
+        self.busy_time += ticks
+
+    def context_switch(self) -> None:
+        """ records the cpu moving on to a different unit than the one it ran last """
+        self.context_switches += 1
+
+    def complete(self, state, end : int) -> None:
+        """ records that the unit completed at the end (inclusive) of a run, after it was reported by `ran` """
+        (first_start,burst) = self._live.pop(state)
+        unit = state.unit
+        if getattr(unit,"edge",False):
+            # the head turning around at the edge of a disk is not a request
+            return
+        arrival = unit.arrival_time
+        turnaround = end - arrival + 1
+        priority = getattr(unit,"priority",None)
+        group = self.groups.get(priority)
+        if group is None:
+            group = self.groups[priority] = {m : QuantileSketch(self.precision) for m in LATENCY_METRICS}
+        group["turnaround time"].add(turnaround)
+        group["wait time"].add(turnaround - burst)
+        group["response time"].add(first_start - arrival)
+        self.completed += 1
+        if self.first_arrival is None or arrival < self.first_arrival:
+            self.first_arrival = arrival
+        if self.last_completion is None or end > self.last_completion:
+            self.last_completion = end
+
+    def merge(self, other : "MetricsCollector") -> "MetricsCollector":
+        """ adds the completed units and counters of the other collector to this one, returns this collector """
+        for (priority,group) in other.groups.items():
+            mine = self.groups.setdefault(priority,{m : QuantileSketch(self.precision) for m in LATENCY_METRICS})
+            for m in LATENCY_METRICS:
+                mine[m].merge(group[m])
+        self.completed += other.completed
+        self.context_switches += other.context_switches
+        self.busy_time += other.busy_time
+        if other.first_arrival is not None and (self.first_arrival is None or other.first_arrival < self.first_arrival):
+            self.first_arrival = other.first_arrival
+        if other.last_completion is not None and (self.last_completion is None or other.last_completion > self.last_completion):
+            self.last_completion = other.last_completion
+        return self
+
+    @property
+    def throughput(self) -> float:
+        """ completed units per time unit, from the first arrival to the last completion """
+        if self.completed == 0:
+            return 0.0
+        return self.completed / (self.last_completion - self.first_arrival + 1)
+
+    def latency(self, priority = ...) -> Dict[str,Dict[str,float]]:
+        """ the distribution (see `QuantileSketch.summary`) of every metric over the units of the given priority, 
+            or over all units if none is given """
+        if priority is not ...:
+            groups = [self.groups[priority]] if priority in self.groups else []
+        else:
+            groups = list(self.groups.values())
+        merged = {m : QuantileSketch(self.precision) for m in LATENCY_METRICS}
+        for group in groups:
+            for m in LATENCY_METRICS:
+                merged[m].merge(group[m])
+        return {m : merged[m].summary() for m in LATENCY_METRICS}
+
+    def priorities(self) -> List[Optional[int]]:
+        """ the priorities of the completed units, None for units without one """
+        return sorted(self.groups,key=lambda p: (p is None,p if p is not None else 0))
+
+    def __getstate__(self):
+        # collectors are only sent between processes once their simulation is over
+        return {k : v for (k,v) in self.__dict__.items() if k != "_live"}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._live = {}
+
+def _fold(n : int, starts : Sequence[int], ends : Sequence[int], unit_idxs : Sequence[int]):
+    completion = [0] * n
+    burst = [0] * n
+    first_start = [None] * n
+    for (a,b,ui) in zip(starts,ends,unit_idxs):
+        if first_start[ui] is None:
+            first_start[ui] = a
+        completion[ui] = b
+        burst[ui] += b - a + 1
+    return (completion,burst,first_start)
+
+def _fold_numpy(n : int, starts : Sequence[int], ends : Sequence[int], unit_idxs : Sequence[int]):
+    np = numpy()
+    starts = np.asarray(starts,dtype=np.int64)
+    ends = np.asarray(ends,dtype=np.int64)
+    unit_idxs = np.asarray(unit_idxs,dtype=np.int64)
+
+    first_start = np.full(n,np.iinfo(np.int64).max,dtype=np.int64)
+    completion = np.zeros(n,dtype=np.int64)
+    np.minimum.at(first_start,unit_idxs,starts)
+    np.maximum.at(completion,unit_idxs,ends)
+
+    burst = np.zeros(n,dtype=np.int64)
+    np.add.at(burst,unit_idxs,ends - starts + 1)
+    return (completion.tolist(),burst.tolist(),first_start.tolist())
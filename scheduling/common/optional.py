@@ -0,0 +1,15 @@
+# optional dependencies, imported the first time they are needed rather than with the package, 
+# so the scripts start quickly and run without them
+
+_numpy = False
+
+def numpy():
+    """ returns the numpy module, or None if it is not installed """
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        _numpy = np
+    return _numpy
@@ -1,115 +1,368 @@
-from .utils import to_csv_string
-from .units import Unit
-from typing import List
+from .units import Track, Unit
+from .metrics import ScheduleMetrics, distribution
+from .table import ProcessTable, TrackTable
+from .optional import numpy
+from . import binary
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+from array import array
+import csv
 
 from os.path import join 
 
+# formats schedules can be saved in, a gantt matrix with a column per run, a table with a row per run, 
+# the compact binary format which `load_schedule` reads back, or a gantt chart (head movement plot for disks) 
+# drawn as an svg image or an html page holding one
+FORMATS = ["wide","long","binary","svg","html"]
+# file extension of each format
+EXTENSIONS = {"wide" : ".csv", "long" : ".csv", "binary" : ".bin", "svg" : ".svg", "html" : ".html"}
+# charts are only imported when drawn
+CHART_FORMATS = ["svg","html"]
+# write buffer of saved schedules
+BUFFER_SIZE = 1 << 20
+
+class RunWriter():
+    columns = ["unit","start","end","length"]
+
+    def __init__(self, path : str, buffer_size : int = BUFFER_SIZE) -> None:
+        """ writes (start, end, unit) runs to a csv file in the long format, one row per run, as they are produced.
+            Can be used as a context manager which closes the file
+
+            Args:
+                path(`str`): file to write
+                buffer_size(`int`): size of the write buffer
+            
+        """
+        self.file = open(path,'w',newline='',buffering=buffer_size)
+        self.writer = csv.writer(self.file,lineterminator="\n")
+        self.writer.writerow(self.columns)
+
+    def __enter__(self) -> "RunWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def row(self, run : Tuple[int,int,Unit]) -> list:
+        (a,b,u) = run
+        return [str(u),a,b,b-a+1]
+
+    def write(self, run : Tuple[int,int,Unit]) -> None:
+        self.writer.writerow(self.row(run))
+
+    def write_all(self, runs : Iterable[Tuple[int,int,Unit]]) -> None:
+        self.writer.writerows(map(self.row,runs))
+
+    def close(self) -> None:
+        self.file.close()
+
+class TrackRunWriter(RunWriter):
+    columns = RunWriter.columns + ["track number","head movement"]
+
+    def __init__(self, path : str, start : Unit, buffer_size : int = BUFFER_SIZE) -> None:
+        """ writes the runs of a disk schedule like `RunWriter`, with the track of every run and the distance the head 
+            travelled to it from the previous one, starting at the given track """
+        super().__init__(path,buffer_size)
+        self.head_position = start.track_number
+
+    def row(self, run : Tuple[int,int,Unit]) -> list:
+        track_number = run[2].track_number
+        movement = abs(track_number - self.head_position)
+        self.head_position = track_number
+        return super().row(run) + [track_number,movement]
+
+class MultiprocessorRunWriter(RunWriter):
+    columns = ["unit","cpu","start","end","length"]
+
+    def row(self, run : Tuple[int,int,Unit,int]) -> list:
+        (a,b,u,cpu) = run
+        return [str(u),cpu,a,b,b-a+1]
+
 class Schedule():
-    def __init__(self, schedule_list : List[Unit]) -> None:
+    # columnar store of the units of this kind of schedule, used by the binary format
+    table_type = ProcessTable
+
+    def __init__(self, runs : List[Tuple[int,int,Unit]]) -> None:
         """
             Args:
-                schedule_list(`List[int]`): list such that the i'th elem is the unit scheduled at the i'th time unit
+                runs(`List[Tuple[int,int,Unit]]`): (start, end, unit) tuples in time order, such that the unit was scheduled 
+                    at every time unit from start to end inclusive
             
         """
-        self.schedule_list = schedule_list
-        print(schedule_list)
         # find all units present in schedule and sort them 
-        self.units = sorted(list(set(self.schedule_list)),key=lambda u: str(u))
-        
-        # create 2d array, where [i],[j]th entry represents process i at time j, 
-        # a 1 entry meaning the process was on the cpu at that time and 0 otherwise 
-
-        self.array = []
-        for u in self.units:
-            row = []
-            for (t,p) in enumerate(self.schedule_list):
-                row.append(int(u == p))
-
-            self.array.append(row)
-        # work out interesting intervals (i.e. we shrink the table horizontally, by concatenating columns which have 1's in the same position and 
-        # are directly adjacent) 
-
-        curr_time = 0
-        curr_unit_idx = self._unit_idx_at_time(curr_time)
-        curr_time = self.units[curr_unit_idx].arrival_time
-        print(curr_time)
-        interval_start = curr_time
-
-        self.intervals = []
-        while curr_time < len(self.schedule_list):
-            
-            if curr_time + 1 >= len(self.schedule_list):
-                self.intervals.append((interval_start,curr_time,curr_unit_idx))
-                break 
-
-            next_unit_idx = self._unit_idx_at_time(curr_time + 1)
-            if next_unit_idx != curr_unit_idx:
-                self.intervals.append((interval_start,curr_time,curr_unit_idx))
-                curr_unit_idx = next_unit_idx
-                interval_start = curr_time + 1
-            
-            curr_time += 1
+        seen : Dict[Unit,None] = {}
+        for (_,_,u) in runs:
+            seen[u] = None
+        self.units = sorted(seen,key=lambda u: str(u))
+        unit_idxs = {u:i for (i,u) in enumerate(self.units)}
+
+        # store the runs as (start, end, unit index) columns, this is all the interesting intervals 
+        # (i.e. the gantt chart shrunk horizontally by concatenating adjacent time units of the same unit)
+        self.starts = array('q')
+        self.ends = array('q')
+        self.unit_idxs = array('q')
+
+        for (a,b,u) in runs:
+            self.starts.append(a)
+            self.ends.append(b)
+            self.unit_idxs.append(unit_idxs[u])
+
+        self._metrics = None
+
+    @classmethod
+    def from_columns(cls, units : List[Unit], starts : Sequence[int], ends : Sequence[int], unit_idxs : Sequence[int]) -> "Schedule":
+        """ creates a schedule straight from its columns (see `intervals`) without copying them, e.g. when loading one """
+        schedule = cls.__new__(cls)
+        schedule.units = units
+        schedule.starts = starts
+        schedule.ends = ends
+        schedule.unit_idxs = unit_idxs
+        schedule._metrics = None
+        return schedule
+
+    @property
+    def intervals(self) -> Iterator[Tuple[int,int,int]]:
+        """ (start, end, unit index into self.units) tuples in time order """
+        return zip(self.starts,self.ends,self.unit_idxs)
+
+    def __len__(self) -> int:
+        """ the number of runs in the schedule """
+        return len(self.starts)
+
+    def runs(self) -> Iterator[Tuple[int,int,Unit]]:
+        """ the (start, end, unit) runs in time order """
+        units = self.units
+        return ((a,b,units[ui]) for (a,b,ui) in self.intervals)
+
+    def metrics(self) -> ScheduleMetrics:
+        """ per unit turnaround, wait, response and completion times, computed once """
+        if self._metrics is None:
+            self._metrics = ScheduleMetrics([u.arrival_time for u in self.units],self.starts,self.ends,self.unit_idxs)
+        return self._metrics
+
+    def run_writer(self, path : str) -> RunWriter:
+        """ returns the writer of the long format for this kind of schedule """
+        return RunWriter(path)
+
+    def interval_names(self) -> List[str]:
+        """ the column name of every run in the wide format """
+        return ["{}-{}({})".format(a,b,b-a+1) for (a,b,_) in self.intervals]
+
+    def gantt_rows(self, max_rows : int) -> Tuple[Sequence[int],List[str]]:
+        """ the row of every run in a gantt chart and the name of every row, a row per unit, 
+            or units next to each other in name order grouped into at most `max_rows` rows """
+        n = len(self.units)
+        row_count = min(n,max_rows)
+        if row_count == n:
+            return (self.unit_idxs,[str(u) for u in self.units])
+        np = numpy()
+        if np is not None:
+            rows = np.asarray(self.unit_idxs,dtype=np.int64) * row_count // n
+        else:
+            rows = array('q',(ui * row_count // n for ui in self.unit_idxs))
+        labels = []
+        for r in range(row_count):
+            (first,last) = (-(-r * n // row_count),-(-(r + 1) * n // row_count) - 1)
+            labels.append("{}..{} ({})".format(self.units[first],self.units[last],last - first + 1))
+        return (rows,labels)
 
-    def _unit_idx_at_time(self,time : int):
-        """ returns the unit index in self.array which was scheduled at the given time """
-        for (i,r) in enumerate(self.array):
-            if r[time]:
-                return i
+    def render(self, width : int = None, max_rows : int = None) -> str:
+        """ draws the schedule as an svg gantt chart of bounded size, see `common.gantt.render_gantt` """
+        from . import gantt
+        (rows,labels) = self.gantt_rows(max_rows or gantt.DEFAULT_MAX_ROWS)
+        return gantt.render_gantt(self.starts,self.ends,rows,labels,width or gantt.DEFAULT_WIDTH,self.unit_idxs,[str(u) for u in self.units])
 
-    def _unit_idx(self,unit : Unit):
-        self.units.index(unit)
+    def describe(self) -> str:
+        """ one line summary of the schedule, shown above its chart """
+        if len(self) == 0:
+            return "no runs"
+        return "{} units, {} runs from time {} to {}".format(len(self.units),len(self),min(self.starts),max(self.ends))
 
-    def save(self,dir : str, file_name : str):
+    def save(self,dir : str, file_name : str, format : str = "wide"):
+        """ saves the schedule as a csv file in one of `FORMATS` """
+        if format == "long":
+            with self.run_writer(join(dir,file_name)) as writer:
+                writer.write_all(self.runs())
+            return
+        if format == "binary":
+            self.save_binary(join(dir,file_name))
+            return
+        if format in CHART_FORMATS:
+            from . import gantt
+            chart = self.render()
+            if format == "html":
+                chart = gantt.to_html(chart,file_name.rsplit(".",1)[0],self.describe())
+            with open(join(dir,file_name),'w',encoding="utf-8") as f:
+                f.write(chart)
+            return
+
+        metrics = self.metrics()
+
+        # positions of each unit's runs among the interval columns
+        run_positions : List[List[int]] = [[] for _ in self.units]
+        for (i,ui) in enumerate(self.unit_idxs):
+            run_positions[ui].append(i)
         
-        with open(join(dir,file_name),'w') as f:
+        with open(join(dir,file_name),'w',newline='',buffering=BUFFER_SIZE) as f:
+            writer = csv.writer(f,lineterminator="\n")
 
             # write interval columns
-            columns = ["{}-{}({})".format(str(a),str(b),b-a+1) for (a,b,_) in self.intervals]
-            columns += ["turnaround time","wait time"]
-
-            header = "unit,{}".format(to_csv_string(columns)) 
-            f.write(header + "\n")
-
-            # write rows
-            avg_turnaround_time = 0
-            avg_wait_time = 0
-
-            for u in self.units:
-                row = [str(u)]
-                for (a,b,ui) in self.intervals:
-                    row.append(str(int(u == self.units[ui])))
-
-                # turnaround time 
-                completion_time = max([b for (_,b,ui) in self.intervals if u == self.units[ui]])
-                submission_time = u.arrival_time 
-                turnaround_time = completion_time - submission_time + 1
-                avg_turnaround_time += turnaround_time
-                row.append(turnaround_time)
-
-                # wait time 
-                burst_time = sum([b - a + 1 for (a,b,ui) in self.intervals if u == self.units[ui]])
-                wait_time = turnaround_time - burst_time
-                avg_wait_time += wait_time
-                row.append(wait_time)
-
-                f.write(to_csv_string(row) + "\n")
-
-            # averages 
-            avg_turnaround_time /= len(self.units)
-            avg_wait_time /= len(self.units)
-
-            averages = ["averages"] + (['_'] * len(self.intervals)) + [avg_turnaround_time,avg_wait_time]
-            f.write(to_csv_string(averages))
+            columns = self.interval_names()
+            writer.writerow(["unit"] + columns + ["turnaround time","wait time"])
+
+            # write rows, 1 in the columns of the unit's runs and 0 elsewhere 
+            zeros = ["0"] * len(self)
+            for (i,u) in enumerate(self.units):
+                row = zeros.copy()
+                for p in run_positions[i]:
+                    row[p] = "1"
+                writer.writerow([str(u)] + row + [metrics.turnaround_times[i],metrics.wait_times[i]])
+
+            # averages, the last line has no line break
+            averages = ["averages"] + (['_'] * len(self)) + [metrics.avg_turnaround_time,metrics.avg_wait_time]
+            f.write(",".join(map(str,averages)))
         # close file
 
+    def save_binary(self, path : str, start : int = 0):
+        """ saves the units and runs of the schedule in the compact binary format """
+        binary.write(path,binary.SCHEDULE,self.table_type(self.units),(self.starts,self.ends,self.unit_idxs),start)
+
 class TrackSchedule(Schedule):
-    def save(self, dir: str, file_name: str):
-        with open(join(dir,file_name),'w') as f:
-            for t in self.schedule_list:
-                f.write(str(t)+",")
+    table_type = TrackTable
+
+    def __init__(self, runs: List[Tuple[int,int,Unit]], start : Unit) -> None:
+        """
+            Args:
+                runs(`List[Tuple[int,int,Unit]]`): see `Schedule`
+                start(`Unit`): track the head starts at
+            
+        """
+        super().__init__(runs)
+        self.start = start
+
+    def head_positions(self) -> Iterator[Unit]:
+        """ tracks visited by the head in order, starting with the initial position """
+        yield self.start
+        for ui in self.unit_idxs:
+            yield self.units[ui]
+
+    def head_position_array(self) -> Sequence[int]:
+        """ track numbers visited by the head in order, starting with the initial position, a numpy array if numpy is available """
+        tracks = [u.track_number for u in self.units]
+        np = numpy()
+        if np is not None:
+            positions = np.empty(len(self) + 1,dtype=np.int64)
+            positions[0] = self.start.track_number
+            np.take(np.asarray(tracks,dtype=np.int64),np.asarray(self.unit_idxs,dtype=np.int64),out=positions[1:])
+            return positions
+        positions = array('q',[self.start.track_number])
+        positions.extend(tracks[ui] for ui in self.unit_idxs)
+        return positions
+
+    def seek_distances(self) -> Sequence[int]:
+        """ distance the head travelled to the track of every run from the previous one """
+        positions = self.head_position_array()
+        np = numpy()
+        if np is not None:
+            return np.abs(np.diff(positions))
+        return array('q',(abs(b - a) for (a,b) in zip(positions,positions[1:])))
+
+    def head_movements(self) -> int:
+        """ total distance travelled by the head """
+        return int(sum(self.seek_distances()) if numpy() is None else self.seek_distances().sum())
+
+    def request_distributions(self) -> Dict[str,Dict[str,float]]:
+        """ distributions of the seek distance to every request and of its response time, 
+            the head turning around at an edge of the disk is not a request """
+        edges = [u.edge for u in self.units]
+        responses = [r for (r,edge) in zip(self.metrics().response_times,edges) if not edge]
+        seeks = self.seek_distances()
+        np = numpy()
+        if np is not None:
+            seeks = seeks[~np.asarray(edges,dtype=bool)[np.asarray(self.unit_idxs,dtype=np.int64)]] if len(self) else seeks
+        else:
+            seeks = [d for (d,ui) in zip(seeks,self.unit_idxs) if not edges[ui]]
+        return {"seek distance" : distribution(seeks), "response time" : distribution(responses)}
+
+    def run_writer(self, path : str) -> RunWriter:
+        return TrackRunWriter(path,self.start)
+
+    def render(self, width : int = None, max_rows : int = None) -> str:
+        """ draws the movement of the head as an svg plot of bounded size, see `common.gantt.render_head_movements` """
+        from . import gantt
+        return gantt.render_head_movements(self.head_position_array(),width or gantt.DEFAULT_WIDTH)
+
+    def describe(self) -> str:
+        return "{} requests, head movements: {}".format(len(self),self.head_movements())
+
+    def save_binary(self, path: str, start : int = 0):
+        super().save_binary(path,self.start.track_number)
+
+    def save(self, dir: str, file_name: str, format : str = "wide"):
+        if format != "wide":
+            super().save(dir,file_name,format)
+            return
+
+        with open(join(dir,file_name),'w',buffering=BUFFER_SIZE) as f:
+            f.write("".join([str(t) + "," for t in self.head_positions()]))
+            f.write("head movements: {}".format(self.head_movements()))
+            # one line per distribution, the last line has no line break
+            for (name,stats) in self.request_distributions().items():
+                f.write("\n{}: {}".format(name," ".join("{}={}".format(k,v) for (k,v) in stats.items())))
+
+class MultiprocessorSchedule(Schedule):
+    def __init__(self, runs : List[Tuple[int,int,Unit,int]], cpu_count : int) -> None:
+        """
+            Args:
+                runs(`List[Tuple[int,int,Unit,int]]`): (start, end, unit, cpu) tuples ordered by start time, runs on different cpus 
+                    can overlap but each unit only runs on one cpu at a time
+                cpu_count(`int`): number of cpus
+            
+        """
+        super().__init__([(a,b,u) for (a,b,u,_) in runs])
+        self.cpus = array('q',[cpu for (_,_,_,cpu) in runs])
+        self.cpu_count = cpu_count
+
+    def runs(self) -> Iterator[Tuple[int,int,Unit,int]]:
+        """ the (start, end, unit, cpu) runs ordered by start time """
+        units = self.units
+        return ((a,b,units[ui],cpu) for ((a,b,ui),cpu) in zip(self.intervals,self.cpus))
+
+    def busy_times(self) -> List[int]:
+        """ number of time units each cpu spent running units """
+        busy = [0] * self.cpu_count
+        for (a,b,cpu) in zip(self.starts,self.ends,self.cpus):
+            busy[cpu] += b - a + 1
+        return busy
+
+    def run_writer(self, path : str) -> RunWriter:
+        return MultiprocessorRunWriter(path)
+
+    def interval_names(self) -> List[str]:
+        return ["cpu{}:{}-{}({})".format(cpu,a,b,b-a+1) for ((a,b,_),cpu) in zip(self.intervals,self.cpus)]
+
+    def gantt_rows(self, max_rows : int) -> Tuple[Sequence[int],List[str]]:
+        """ a row per cpu """
+        return (self.cpus,["cpu{}".format(c) for c in range(self.cpu_count)])
+
+    def describe(self) -> str:
+        busy = self.busy_times()
+        return "{} over {} cpus, busy for {} time units".format(super().describe(),self.cpu_count," ".join(map(str,busy)))
+
+    def save_binary(self, path : str, start : int = 0):
+        raise ValueError("the binary format cannot hold the cpus of a multiprocessor schedule, save it in another format")
 
-            sum_tracks = 0
-            for i in range(len(self.schedule_list) - 1):
-                sum_tracks += abs(self.schedule_list[i+1].track_number - self.schedule_list[i].track_number)
+def load_schedule(path : str) -> Schedule:
+    """ loads a schedule saved in the binary format, its columns and units are mapped from the file rather than read in """
+    (table,(starts,ends,unit_idxs),start) = binary.read(path,binary.SCHEDULE) 
+    if isinstance(table,TrackTable):
+        schedule = TrackSchedule.from_columns(table.units(),starts,ends,unit_idxs)
+        schedule.start = Track(0,str(start),start)
+        return schedule
+    return Schedule.from_columns(table.units(),starts,ends,unit_idxs)
 
-            f.write("head movements: {}".format(sum_tracks))
\ No newline at end of file
+def save_summary(path : str, columns : List[str], rows : Iterable[list]):
+    """ writes a table with one row per run, e.g. of a batch of scheduling runs """
+    with open(path,'w',newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(rows)
@@ -0,0 +1,345 @@
+from typing import Iterable, List, Sequence, Tuple
+from collections import OrderedDict, deque
+from array import array
+import heapq
+
+
+class PageFaults():
+    __slots__ = ("frames","references","faults")
+
+    def __init__(self, frames : int, references : int, faults : int) -> None:
+        """ outcome of running a page replacement algorithm over a reference string with a fixed number of frames """
+        self.frames = frames
+        self.references = references
+        self.faults = faults
+
+    @property
+    def hits(self) -> int:
+        return self.references - self.faults
+
+    @property
+    def fault_rate(self) -> float:
+        return self.faults / self.references if self.references else 0.0
+
+class FaultCurve():
+    def __init__(self, references : int, distances : array) -> None:
+        """ fault counts of a stack algorithm for every number of frames up to a maximum, from one pass over a reference string 
+
+            Args:
+                references(`int`): length of the reference string
+                distances(`array`): number of references at each stack distance, index 0 is unused and 
+                    the last index is the maximum number of frames
+        """
+        self.references = references
+        self.max_frames = len(distances) - 1
+        # hits with f frames are the references at a stack distance of at most f
+        self.hits = array('q',bytes(8 * len(distances)))
+        for f in range(1,len(distances)):
+            self.hits[f] = self.hits[f-1] + distances[f]
+
+    def faults(self, frames : int) -> int:
+        if frames < 1 or frames > self.max_frames:
+            raise ValueError("the curve covers 1 to {} frames, not {}".format(self.max_frames,frames))
+        return self.references - self.hits[frames]
+
+    def at(self, frames : int) -> PageFaults:
+        return PageFaults(frames,self.references,self.faults(frames))
+
+class PageReplacementAlgorithm():
+    # whether `simulate` needs the whole reference string up front rather than an iterator over it
+    needs_sequence = False
+    # whether the algorithm has the inclusion property (the pages held with f frames are always also held with f + 1), 
+    # which lets `fault_curve` find the faults for every number of frames at once
+    stack_algorithm = False
+
+    def simulate(self, references : Iterable[int], frames : int) -> PageFaults:
+        """ runs the algorithm over the reference string with the given number of initially empty frames,
+            override this for specific behaviour
+
+            Args:
+                references(`Iterable[int]`): the referenced pages in order, a lazy iterator unless `needs_sequence` is set
+                frames(`int`): number of page frames, at least 1
+        """
+        raise NotImplementedError()
+
+    def fault_curve(self, references : Iterable[int], max_frames : int) -> FaultCurve:
+        """ runs the algorithm once over the reference string, giving the faults for every number of frames up to the maximum,
+            only stack algorithms override this """
+        raise NotImplementedError()
+
+class FIFO(PageReplacementAlgorithm):
+    def simulate(self, references: Iterable[int], frames: int) -> PageFaults:
+        # evicts the page loaded longest ago
+        resident = set()
+        order = deque()
+        n = 0
+        faults = 0
+        for page in references:
+            n += 1
+            if page in resident:
+                continue
+            faults += 1
+            if len(order) == frames:
+                resident.discard(order.popleft())
+            resident.add(page)
+            order.append(page)
+        return PageFaults(frames,n,faults)
+
+class LRU(PageReplacementAlgorithm):
+    def simulate(self, references: Iterable[int], frames: int) -> PageFaults:
+        # pages in order of last use, least recent first, every access is O(1)
+        resident = OrderedDict()
+        n = 0
+        faults = 0
+        for page in references:
+            n += 1
+            if page in resident:
+                resident.move_to_end(page)
+                continue
+            faults += 1
+            if len(resident) == frames:
+                resident.popitem(last=False)
+            resident[page] = None
+        return PageFaults(frames,n,faults)
+
+    stack_algorithm = True
+
+    def fault_curve(self, references: Iterable[int], max_frames: int) -> FaultCurve:
+        # the stack distance of a reference is the number of distinct pages used since the last reference to the same page,
+        # counted over a fenwick tree holding a mark at the time of the latest reference to every page.
+        # times are renumbered once the tree fills up, so it only grows with the number of distinct pages
+        distances = array('q',bytes(8 * (max_frames + 1)))
+        size = 1 << 16
+        tree = [0] * (size + 1)
+        last = {}
+        t = 0
+        n = 0
+        for page in references:
+            n += 1
+            if t == size:
+                size = max(size,2 * len(last))
+                (tree,last) = _renumber(last,size)
+                t = len(last)
+            t += 1
+
+            j = last.get(page)
+            if j is not None:
+                # marks up to and including j
+                before = 0
+                i = j
+                while i > 0:
+                    before += tree[i]
+                    i &= i - 1
+                d = len(last) - before + 1
+                if d <= max_frames:
+                    distances[d] += 1
+                i = j
+                while i <= size:
+                    tree[i] -= 1
+                    i += i & -i
+
+            last[page] = t
+            i = t
+            while i <= size:
+                tree[i] += 1
+                i += i & -i
+        return FaultCurve(n,distances)
+
+class Clock(PageReplacementAlgorithm):
+    def simulate(self, references: Iterable[int], frames: int) -> PageFaults:
+        # second chance, the hand clears reference bits until it finds a page without one
+        slots = [None] * frames
+        referenced = bytearray(frames)
+        where = {}
+        hand = 0
+        n = 0
+        faults = 0
+        for page in references:
+            n += 1
+            slot = where.get(page)
+            if slot is not None:
+                referenced[slot] = 1
+                continue
+            faults += 1
+            while referenced[hand]:
+                referenced[hand] = 0
+                hand = (hand + 1) % frames
+            if slots[hand] is not None:
+                del where[slots[hand]]
+            slots[hand] = page
+            where[page] = hand
+            referenced[hand] = 1
+            hand = (hand + 1) % frames
+        return PageFaults(frames,n,faults)
+
+class LFU(PageReplacementAlgorithm):
+    def simulate(self, references: Iterable[int], frames: int) -> PageFaults:
+        # evicts the resident page with the fewest uses since it was loaded, the least recently used of those on ties.
+        # pages are kept in one bucket per use count, so every access is O(1)
+        counts = {}
+        buckets = {}
+        min_count = 0
+        n = 0
+        faults = 0
+        for page in references:
+            n += 1
+            count = counts.get(page)
+            if count is not None:
+                bucket = buckets[count]
+                del bucket[page]
+                if not bucket:
+                    del buckets[count]
+                    if min_count == count:
+                        min_count = count + 1
+                counts[page] = count + 1
+                buckets.setdefault(count + 1,OrderedDict())[page] = None
+                continue
+            faults += 1
+            if len(counts) == frames:
+                bucket = buckets[min_count]
+                (victim,_) = bucket.popitem(last=False)
+                if not bucket:
+                    del buckets[min_count]
+                del counts[victim]
+            counts[page] = 1
+            buckets.setdefault(1,OrderedDict())[page] = None
+            min_count = 1
+        return PageFaults(frames,n,faults)
+
+class OPT(PageReplacementAlgorithm):
+    needs_sequence = True
+
+    def simulate(self, references: Sequence[int], frames: int) -> PageFaults:
+        # evicts the page whose next use is furthest away, looked up in a precomputed index instead of scanning ahead.
+        # resident pages sit in a max heap by next use, entries made stale by a later access are skipped when popped
+        next_use = next_uses(references)
+        resident = {}
+        heap = []
+        faults = 0
+        for (i,page) in enumerate(references):
+            upcoming = next_use[i]
+            if page not in resident:
+                faults += 1
+                if len(resident) == frames:
+                    while True:
+                        (neg_use,victim) = heapq.heappop(heap)
+                        if resident.get(victim) == -neg_use:
+                            del resident[victim]
+                            break
+            resident[page] = upcoming
+            heapq.heappush(heap,(-upcoming,page))
+
+            # the heap only ever needs one entry per resident page, drop the stale ones once they dominate it
+            if len(heap) > 2 * frames + 64:
+                heap = [(-u,p) for (p,u) in resident.items()]
+                heapq.heapify(heap)
+        return PageFaults(frames,len(references),faults)
+
+    stack_algorithm = True
+
+    def fault_curve(self, references: Sequence[int], max_frames: int) -> FaultCurve:
+        # Mattson's priority stack, slot f holds the page which a cache of f + 1 frames holds on top of those of f frames.
+        # The referenced page goes to the top slot, and the page it displaces is carried down, swapping with every page 
+        # needed later than it, until it takes the slot the referenced page left. Those swaps are found with a max tree 
+        # over the next uses of the slots, and pages carried past the deepest slot of interest are forgotten
+        next_use = next_uses(references)
+        distances = array('q',bytes(8 * (max_frames + 1)))
+        width = 1
+        while width < max_frames:
+            width *= 2
+        tree = [-1] * (2 * width)
+        pages = [None] * max_frames
+        slot = {}
+        depth = 0
+
+        def assign(s, page, use):
+            pages[s] = page
+            slot[page] = s
+            i = s + width
+            tree[i] = use
+            i >>= 1
+            while i:
+                tree[i] = max(tree[2*i],tree[2*i+1])
+                i >>= 1
+
+        def first_later(lo, use):
+            # first slot from lo on with a later next use, or the width if there is none
+            if lo >= width:
+                return width
+            i = lo + width
+            while tree[i] <= use:
+                while i & 1:
+                    i >>= 1
+                if i == 0:
+                    return width
+                i += 1
+            while i < width:
+                i = 2*i if tree[2*i] > use else 2*i + 1
+            return i - width
+
+        for (t,page) in enumerate(references):
+            k = slot.get(page)
+            if k == 0:
+                distances[1] += 1
+                assign(0,page,next_use[t])
+                continue
+            if depth == 0:
+                assign(0,page,next_use[t])
+                depth = 1
+                continue
+
+            end = k if k is not None else depth
+            carried = pages[0]
+            carried_use = tree[width]
+            assign(0,page,next_use[t])
+            s = first_later(1,carried_use)
+            while s < end:
+                (displaced,displaced_use) = (pages[s],tree[s + width])
+                assign(s,carried,carried_use)
+                (carried,carried_use) = (displaced,displaced_use)
+                s = first_later(s + 1,carried_use)
+
+            if k is not None:
+                distances[k + 1] += 1
+                assign(k,carried,carried_use)
+            elif depth < max_frames:
+                assign(depth,carried,carried_use)
+                depth += 1
+            else:
+                del slot[carried]
+        return FaultCurve(len(references),distances)
+
+def _renumber(last : dict, size : int) -> tuple:
+    """ maps the times of the latest references to 1..number of pages in the same order, 
+        returns a fenwick tree of the given size marking them and the new times """
+    renumbered = {page:i for (i,page) in enumerate(sorted(last,key=last.get),1)}
+    tree = [0] * (size + 1)
+    for i in range(1,len(renumbered) + 1):
+        tree[i] = 1
+    for i in range(1,size + 1):
+        parent = i + (i & -i)
+        if parent <= size:
+            tree[parent] += tree[i]
+    return (tree,renumbered)
+
+def next_uses(references : Sequence[int]) -> array:
+    """ returns, for every position in the reference string, the position at which the same page is referenced next,
+        or the length of the string if it never is """
+    n = len(references)
+    result = array('q',bytes(8 * n))
+    last = {}
+    for i in range(n - 1,-1,-1):
+        page = references[i]
+        result[i] = last.get(page,n)
+        last[page] = i
+    return result
+
+def create_page_algorithms() -> List[Tuple[str,PageReplacementAlgorithm]]:
+    """ returns the (name, algorithm) pairs to compare in page mode """
+    return [
+        ("FIFO", FIFO()),
+        ("LRU", LRU()),
+        ("OPT", OPT()),
+        ("Clock", Clock()),
+        ("LFU", LFU()),
+    ]
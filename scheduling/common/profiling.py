@@ -0,0 +1,124 @@
+from typing import Any, Callable, Dict, List
+from contextlib import contextmanager
+from time import perf_counter
+
+# phases time is reported for, choose includes the queue operations the algorithm performs while choosing
+PHASES = ["simulate","arrivals","choose","queue","schedule","save"]
+
+class AlgorithmProfile():
+    def __init__(self, name : str) -> None:
+        """ counters and per phase times of one algorithm's run """
+        self.name = name
+        self.ticks = 0
+        self.decisions = 0
+        self.context_switches = 0
+        self.arrivals = 0
+        self.max_ready = 0
+        self.total_ready = 0
+        self.times : Dict[str,float] = {p:0.0 for p in PHASES}
+        self.last = None
+        # phases currently being timed, so nested calls (e.g. extend calling append) are only counted once
+        self.active = set()
+
+    @property
+    def mean_ready(self) -> float:
+        """ mean ready queue length seen by the scheduling decisions """
+        return self.total_ready / self.decisions if self.decisions else 0
+
+    def to_dict(self) -> Dict[str,Any]:
+        return {
+            "algorithm" : self.name,
+            "ticks" : self.ticks,
+            "decisions" : self.decisions,
+            "context_switches" : self.context_switches,
+            "arrivals" : self.arrivals,
+            "max_ready" : self.max_ready,
+            "mean_ready" : self.mean_ready,
+            "times_s" : dict(self.times),
+        }
+
+class Profiler():
+    def __init__(self) -> None:
+        """ opt-in instrumentation of scheduling algorithms, `instrument` wraps the methods of a single algorithm instance, 
+            so algorithms which are not instrumented run the plain code with no overhead """
+        self.profiles : List[AlgorithmProfile] = []
+
+    def instrument(self, name : str, algorithm) -> AlgorithmProfile:
+        """ wraps the simulation hooks of the given algorithm instance so its runs are recorded in the returned profile """
+        profile = AlgorithmProfile(name)
+        self.profiles.append(profile)
+
+        algorithm.simulate = self._timed(profile,"simulate",algorithm.simulate)
+        algorithm.create_schedule = self._timed(profile,"schedule",algorithm.create_schedule)
+
+        choose_run = algorithm.choose_run
+        def profiled_choose_run(units, max_ticks):
+            start = perf_counter()
+            (unit,ticks) = choose_run(units,max_ticks)
+            profile.times["choose"] += perf_counter() - start
+
+            profile.decisions += 1
+            profile.ticks += ticks
+            profile.total_ready += len(units)
+            profile.max_ready = max(profile.max_ready,len(units))
+            if profile.last is not None and profile.last is not unit:
+                profile.context_switches += 1
+            profile.last = unit
+            return (unit,ticks)
+        algorithm.choose_run = profiled_choose_run
+
+        create_arrival_queue = algorithm.create_arrival_queue
+        def profiled_create_arrival_queue(units):
+            arrival_queue = create_arrival_queue(units)
+            pop_arrived = self._timed(profile,"arrivals",arrival_queue.pop_arrived)
+            def profiled_pop_arrived(time):
+                arrived = pop_arrived(time)
+                profile.arrivals += len(arrived)
+                return arrived
+            arrival_queue.pop_arrived = profiled_pop_arrived
+            return arrival_queue
+        algorithm.create_arrival_queue = profiled_create_arrival_queue
+
+        create_ready_queue = algorithm.create_ready_queue
+        def profiled_create_ready_queue():
+            ready_queue = create_ready_queue()
+            for method in ["append","extend","remove","update"]:
+                setattr(ready_queue,method,self._timed(profile,"queue",getattr(ready_queue,method)))
+            return ready_queue
+        algorithm.create_ready_queue = profiled_create_ready_queue
+
+        return profile
+
+    @contextmanager
+    def time(self, profile : AlgorithmProfile, phase : str):
+        """ adds the time spent in the block to the phase of the profile """
+        start = perf_counter()
+        try:
+            yield 
+        finally:
+            profile.times[phase] += perf_counter() - start
+
+    def _timed(self, profile : AlgorithmProfile, phase : str, f : Callable) -> Callable:
+        def timed(*args,**kwargs):
+            if phase in profile.active:
+                return f(*args,**kwargs)
+
+            profile.active.add(phase)
+            start = perf_counter()
+            try:
+                return f(*args,**kwargs)
+            finally:
+                profile.times[phase] += perf_counter() - start
+                profile.active.discard(phase)
+        return timed
+
+    def to_dict(self) -> Dict[str,Any]:
+        return {"algorithms" : [p.to_dict() for p in self.profiles]}
+
+    def summary(self) -> str:
+        """ returns a table of the recorded profiles """
+        columns = ["algorithm","ticks","decisions","switches","max ready","mean ready"] + ["{} (s)".format(p) for p in PHASES]
+        rows = [[p.name,p.ticks,p.decisions,p.context_switches,p.max_ready,"{:.1f}".format(p.mean_ready)] 
+            + ["{:.4f}".format(p.times[phase]) for phase in PHASES] for p in self.profiles]
+        widths = [max(len(str(x)) for x in col) for col in zip(columns,*rows)]
+        return "\n".join(" ".join(str(x).rjust(w) for (x,w) in zip(r,widths)) for r in [columns] + rows)
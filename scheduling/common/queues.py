@@ -0,0 +1,305 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+from heapq import heapify, heappush, heappop
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from .units import Unit
+
+
+class ReadyQueue(list):
+    """ default ready queue, a plain list of units in arrival order which algorithms are free to reorder """
+
+    def update(self, unit : Unit) -> None:
+        """ called after the given unit did some work """
+        pass
+
+class HeapReadyQueue():
+    def __init__(self, key : Callable[[Unit],Any]) -> None:
+        """ ready queue ordered by the given key, ties are broken by arrival order (like a stable sort of the list would)
+            
+            Args:
+                key(`Callable[[Unit],Any]`): the key to order units by, smallest first
+            
+        """
+        self.key = key
+        self.heap : List[list] = []
+        self.entries : Dict[Unit,list] = {}
+        self.count = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, unit : Unit) -> bool:
+        return unit in self.entries
+
+    def __iter__(self) -> Iterator[Unit]:
+        """ iterates units in arrival order """
+        return iter(self.entries)
+
+    def __reversed__(self) -> Iterator[Unit]:
+        return reversed(self.entries)
+
+    def append(self, unit : Unit) -> None:
+        entry = [self.key(unit),self.count,unit]
+        self.count += 1
+        self.entries[unit] = entry
+        heappush(self.heap,entry)
+
+    def extend(self, units : Iterable[Unit]) -> None:
+        for u in units:
+            self.append(u)
+
+    def remove(self, unit : Unit) -> None:
+        # invalidate the entry, it gets dropped once it reaches the top of the heap
+        entry = self.entries.pop(unit)
+        entry[2] = None
+        self._compact()
+
+    def update(self, unit : Unit) -> None:
+        """ re-positions the unit if its key changed, keeping its place among equal keys """
+        entry = self.entries.get(unit)
+        if entry is None:
+            return
+
+        key = self.key(unit)
+        if key != entry[0]:
+            entry[2] = None
+            new_entry = [key,entry[1],unit]
+            self.entries[unit] = new_entry
+            heappush(self.heap,new_entry)
+            self._compact()
+
+    def _compact(self) -> None:
+        # invalidated entries deep in the heap may never reach the top, drop them once they outnumber the valid ones
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = list(self.entries.values())
+            heapify(self.heap)
+
+    def peek(self) -> Unit:
+        """ returns the unit with the smallest key, the earliest arrived one among equal keys """
+        while self.heap[0][2] is None:
+            heappop(self.heap)
+        return self.heap[0][2]
+
+class SortedBlocks():
+    # entries per block, blocks are split once they grow to twice this
+    BLOCK_SIZE = 512
+
+    def __init__(self) -> None:
+        """ sorted list of entries kept in blocks of bounded size, with the last entry of every block in a separate list. 
+            Lookups bisect the block ends, then a single block, and inserting or removing only shifts the entries 
+            of one block, so both stay cheap with millions of entries """
+        self.blocks : List[list] = []
+        self.maxes : List[Any] = []
+
+    def add(self, entry) -> None:
+        if not self.blocks:
+            self.blocks.append([entry])
+            self.maxes.append(entry)
+            return
+        b = min(bisect_left(self.maxes,entry),len(self.blocks) - 1)
+        block = self.blocks[b]
+        insort(block,entry)
+        self.maxes[b] = block[-1]
+        if len(block) >= 2 * self.BLOCK_SIZE:
+            self.blocks.insert(b + 1,block[self.BLOCK_SIZE:])
+            del block[self.BLOCK_SIZE:]
+            self.maxes.insert(b,block[-1])
+
+    def remove(self, entry) -> None:
+        b = bisect_left(self.maxes,entry)
+        block = self.blocks[b]
+        del block[bisect_left(block,entry)]
+        if block:
+            self.maxes[b] = block[-1]
+        else:
+            del self.blocks[b]
+            del self.maxes[b]
+
+    def ceiling(self, key):
+        """ the smallest entry at or above the key, None if there is none """
+        b = bisect_left(self.maxes,key)
+        if b == len(self.blocks):
+            return None
+        block = self.blocks[b]
+        return block[bisect_left(block,key)]
+
+    def floor(self, key):
+        """ the largest entry at or below the key, None if there is none """
+        b = bisect_left(self.maxes,key)
+        if b < len(self.blocks):
+            block = self.blocks[b]
+            i = bisect_right(block,key)
+            if i > 0:
+                return block[i-1]
+        return self.maxes[b-1] if b > 0 else None
+
+class TrackIndex():
+    def __init__(self) -> None:
+        """ ready queue of tracks kept sorted by track number, supports nearest track lookups in O(log n)
+            ties between tracks at equal distance are broken by arrival order """
+        self.sorted = SortedBlocks()
+        self.entries : Dict[Unit,tuple] = OrderedDict()
+        self.count = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, unit : Unit) -> bool:
+        return unit in self.entries
+
+    def __iter__(self) -> Iterator[Unit]:
+        """ iterates tracks in arrival order """
+        return iter(self.entries)
+
+    def append(self, unit : Unit) -> None:
+        entry = (unit.track_number,self.count,unit)
+        self.count += 1
+        self.entries[unit] = entry
+        self.sorted.add(entry)
+
+    def extend(self, units : Iterable[Unit]) -> None:
+        for u in units:
+            self.append(u)
+
+    def remove(self, unit : Unit) -> None:
+        self.sorted.remove(self.entries.pop(unit))
+
+    def update(self, unit : Unit) -> None:
+        pass
+
+    def first(self) -> Unit:
+        """ returns the earliest arrived track """
+        return next(iter(self.entries))
+
+    def _first_at_or_above(self, track_number : int) -> tuple:
+        """ entry of the earliest arrived track among the lowest tracks at or above the given track number, None if there are none """
+        return self.sorted.ceiling((track_number,))
+
+    def _first_at_or_below(self, track_number : int) -> tuple:
+        """ entry of the earliest arrived track among the highest tracks at or below the given track number, None if there are none """
+        highest = self.sorted.floor((track_number,float('inf')))
+        if highest is None:
+            return None
+        return self.sorted.ceiling((highest[0],))
+
+    def nearest(self, head_position : int) -> Unit:
+        """ returns the track closest to the head position """
+        below = self._first_at_or_below(head_position)
+        above = self.sorted.ceiling((head_position,float('inf')))
+
+        if below is None:
+            return above[2]
+        if above is None:
+            return below[2]
+
+        (low,low_count,low_unit) = below
+        (high,high_count,high_unit) = above
+        low_distance = head_position - low
+        high_distance = high - head_position
+        if low_distance == high_distance:
+            return low_unit if low_count < high_count else high_unit 
+        return low_unit if low_distance < high_distance else high_unit
+
+    def nearest_in_direction(self, head_position : int, direction : int) -> Unit:
+        """ returns the track closest to the head position, out of those in the given direction (1 towards high, -1 towards low), 
+            None if there are none """
+        if direction > 0:
+            entry = self._first_at_or_above(head_position)
+        elif direction < 0:
+            entry = self._first_at_or_below(head_position)
+        elif len(self.entries) > 0:
+            return self.nearest(head_position)
+        else:
+            return None
+        return entry[2] if entry is not None else None
+
+    def furthest(self, direction : int) -> Unit:
+        """ returns the highest track (1) or the lowest (-1), the earliest arrived one among several on that track """
+        return self.nearest_in_direction(float('inf') if direction > 0 else float('-inf'),-direction)
+
+class ReadyDeque(deque):
+    """ ready queue in arrival order, with O(1) removal and rotation of the units at either end """
+
+    def update(self, unit : Unit) -> None:
+        pass
+
+    def __contains__(self, unit : Unit) -> bool:
+        if self and (self[0] is unit or self[-1] is unit):
+            return True
+        return super().__contains__(unit)
+
+    def remove(self, unit : Unit) -> None:
+        if self and self[0] is unit:
+            self.popleft()
+        elif self and self[-1] is unit:
+            self.pop()
+        else:
+            super().remove(unit)
+
+    def move_to_back(self, unit : Unit) -> None:
+        if self and self[0] is unit:
+            self.rotate(-1)
+        else:
+            self.remove(unit)
+            self.append(unit)
+
+class PriorityLevels():
+    def __init__(self) -> None:
+        """ ready queue with one `ReadyDeque` per priority level (lower is better), each in arrival order, 
+            and a heap of the non-empty levels """
+        self.levels : Dict[int,ReadyDeque] = {}
+        self.heap : List[int] = []
+        self.in_heap = set()
+        self.members : Dict[Unit,int] = {}
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __contains__(self, unit : Unit) -> bool:
+        return unit in self.members
+
+    def __iter__(self) -> Iterator[Unit]:
+        """ iterates units by priority, then arrival order """
+        for p in sorted(self.levels):
+            yield from self.levels[p]
+
+    def __reversed__(self) -> Iterator[Unit]:
+        for p in sorted(self.levels,reverse=True):
+            yield from reversed(self.levels[p])
+
+    def append(self, unit : Unit) -> None:
+        p = unit.priority
+        level = self.levels.get(p)
+        if level is None:
+            level = self.levels[p] = ReadyDeque()
+        level.append(unit)
+        self.members[unit] = p
+
+        if p not in self.in_heap:
+            self.in_heap.add(p)
+            heappush(self.heap,p)
+
+    def extend(self, units : Iterable[Unit]) -> None:
+        for u in units:
+            self.append(u)
+
+    def remove(self, unit : Unit) -> None:
+        self.levels[self.members.pop(unit)].remove(unit)
+
+    def update(self, unit : Unit) -> None:
+        pass
+
+    def move(self, unit : Unit) -> None:
+        """ moves the unit to the back of the level of its current priority, after its priority changed """
+        self.remove(unit)
+        self.append(unit)
+
+    def highest(self) -> int:
+        """ returns the best priority with units in it """
+        while not self.levels[self.heap[0]]:
+            self.in_heap.discard(heappop(self.heap))
+        return self.heap[0]
+
+    def level(self, priority : int) -> ReadyDeque:
+        """ returns the units of the given priority in arrival order """
+        return self.levels[priority]
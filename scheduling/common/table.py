@@ -0,0 +1,144 @@
+from typing import Dict, Iterable, List, Sequence
+from array import array
+from .units import ProcessState, TrackState, Unit, UnitState
+from .optional import numpy
+
+
+class UnitTable():
+    # (column name, array typecode) pairs, override
+    columns = ()
+    # type of the views over single units, override
+    view_type = None
+
+    def __init__(self, units : Iterable[Unit] = ()) -> None:
+        """ columnar store of units, with one array per attribute instead of one object per unit. 
+            Schedulers work on the light-weight views returned by `units`, which read the arrays by index. 
+            The table is never written to while scheduling, so it can be shared by any number of runs.
+
+            Args:
+                units(`Iterable[Unit]`): units to copy into the table
+            
+        """
+        self.names : List[str] = []
+        self.base : Dict[str,array] = {c:array(t) for (c,t) in self.columns}
+        for u in units:
+            self.append(u)
+        self._views = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_columns(cls, names : Sequence[str], base : Dict[str,Sequence[int]]) -> "UnitTable":
+        """ creates a table over existing columns without copying them, e.g. mapped from a binary file, 
+            such a table is read only """
+        table = cls()
+        table.names = names
+        table.base = base
+        return table
+
+    def __getstate__(self):
+        # views are cheap to rebuild, only ship the columns, as plain arrays if they are mapped from a file
+        names = self.names if isinstance(self.names,list) else list(self.names)
+        base = {c:self.base[c] if isinstance(self.base[c],array) else array(t,self.base[c]) for (c,t) in self.columns}
+        return (names,base)
+
+    def __setstate__(self, state):
+        (self.names,self.base) = state
+        self._views = None
+
+    def append(self, unit : Unit) -> None:
+        self.names.append(unit.name)
+        for (c,_) in self.columns:
+            # optional attributes which are not set are stored as -1
+            value = getattr(unit,c)
+            self.base[c].append(-1 if value is None else value)
+
+    def units(self) -> List[Unit]:
+        """ returns one view per unit, in table order """
+        if self._views is None or len(self._views) != len(self):
+            self._views = [self.view_type(self,i) for i in range(len(self))]
+        return self._views
+
+    def as_numpy(self, column : str):
+        """ returns a numpy array sharing memory with the given column, needs numpy """
+        np = numpy()
+        if np is None:
+            raise ImportError("numpy is required for as_numpy")
+        col = self.base[column]
+        dtype = col.typecode if isinstance(col,array) else col.format
+        return np.frombuffer(col,dtype=dtype) if len(col) > 0 else np.zeros(0,dtype=dtype)
+
+class UnitView():
+    __slots__ = ("table","index")
+
+    def __init__(self, table : UnitTable, index : int) -> None:
+        self.table = table
+        self.index = index
+
+    @property
+    def name(self) -> str:
+        return self.table.names[self.index]
+
+    @property
+    def arrival_time(self) -> int:
+        return self.table.base["arrival_time"][self.index]
+
+    def __str__(self) -> str:
+        return self.name
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+    def start(self) -> UnitState:
+        """ override, returns fresh state for a run over this unit """
+        pass
+
+### ------- ###
+### PROCESS ###
+### ------- ###
+
+class ProcessView(UnitView):
+    __slots__ = ()
+
+    @property
+    def cpu_time(self) -> int:
+        return self.table.base["cpu_time"][self.index]
+
+    @property
+    def priority(self) -> int:
+        return self.table.base["priority"][self.index]
+
+    @property
+    def affinity(self) -> int:
+        cpu = self.table.base["affinity"][self.index]
+        return None if cpu < 0 else cpu
+
+    def start(self) -> ProcessState:
+        return ProcessState(self)
+
+class ProcessTable(UnitTable):
+    columns = (("arrival_time","q"),("cpu_time","q"),("priority","q"),("affinity","q"))
+    view_type = ProcessView
+
+### ------- ###
+### DISK    ###
+### ------- ###
+
+class TrackView(UnitView):
+    __slots__ = ()
+
+    @property
+    def track_number(self) -> int:
+        return self.table.base["track_number"][self.index]
+
+    @property
+    def edge(self) -> bool:
+        return self.table.base["edge"][self.index] != 0
+
+    def start(self) -> TrackState:
+        return TrackState(self)
+
+class TrackTable(UnitTable):
+    columns = (("arrival_time","q"),("track_number","q"),("edge","q"))
+    view_type = TrackView
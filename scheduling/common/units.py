@@ -1,7 +1,12 @@
+from typing import List
 
 
 class Unit():
+    __slots__ = ("arrival_time","name")
+
     def __init__(self, arrival_time : int, name : str) -> None:
+        """ immutable description of a scheduling unit, the state a unit accumulates while being scheduled 
+            lives in the `UnitState` returned by `start`, so one unit can take part in any number of runs """
         self.arrival_time = arrival_time
         self.name = name 
 
@@ -11,60 +16,150 @@ class Unit():
     def __repr__(self) -> str:
         return self.__str__()
 
-    def do_work(self)-> None:
+    def start(self) -> "UnitState":
+        """ override, returns fresh state for a run over this unit """
+        pass
+
+    def parse(csvLine :str):
         """ override """
         pass
 
-    def finished(self) -> bool:
+    def from_fields(fields : List[str]):
+        """ override, creates a unit from the already split fields of a csv line """
+        pass
+
+class UnitState():
+    __slots__ = ("unit","arrival_time")
+
+    def __init__(self, unit : Unit) -> None:
+        """ state of a unit during a single run, owned by the simulation """
+        self.unit = unit
+        self.arrival_time = unit.arrival_time
+
+    @property
+    def name(self) -> str:
+        return self.unit.name
+
+    def __str__(self) -> str:
+        return str(self.unit)
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+    def do_work(self, ticks : int = 1)-> None:
         """ override """
         pass
 
-    def parse(csvLine :str):
+    def finished(self) -> bool:
         """ override """
         pass
 
+    def work_left(self) -> int:
+        """ override, number of ticks of work left before the unit is finished """
+        pass
+
+### ------- ###
+### PROCESS ###
+### ------- ###
+
 class Process(Unit):
-    def __init__(self, arrival_time: int, name: str, cpu_time : int, priority : int = None) -> None:
+    __slots__ = ("cpu_time","priority","affinity")
+
+    def __init__(self, arrival_time: int, name: str, cpu_time : int, priority : int = None, affinity : int = None) -> None:
         super().__init__(arrival_time, name)
 
         self.cpu_time = cpu_time
         self.priority = priority
-        self.cpu_time_left = cpu_time
+        # cpu the process is pinned to when scheduling over several cpus, None if it can run on any
+        self.affinity = affinity
 
-    def do_work(self):
-        self.cpu_time_left -= 1
+    def start(self) -> "ProcessState":
+        return ProcessState(self)
 
-    def finished(self):
-        return self.cpu_time_left <= 0
-    
     @staticmethod
     def parse(csvLine : str) -> Unit :
-        params = csvLine.split(",")
+        return Process.from_fields(csvLine.split(","))
 
+    @staticmethod
+    def from_fields(params : List[str]) -> Unit :
         name = params[0]
         arrival = int(params[1])
         cpu_time = int(params[2])
         priority = int(params[3])
-        return Process(arrival,name,cpu_time,priority=priority)
+        affinity = int(params[4]) if len(params) > 4 and params[4].strip() else None
+        return Process(arrival,name,cpu_time,priority=priority,affinity=affinity)
+
+class ProcessState(UnitState):
+    __slots__ = ("cpu_time_left","priority")
+
+    def __init__(self, unit : Process) -> None:
+        super().__init__(unit)
+        self.cpu_time_left = unit.cpu_time
+        self.priority = unit.priority
+
+    @property
+    def cpu_time(self) -> int:
+        return self.unit.cpu_time
+
+    def do_work(self, ticks : int = 1):
+        self.cpu_time_left -= ticks
+
+    def finished(self):
+        return self.cpu_time_left <= 0
+
+    def work_left(self) -> int:
+        return max(self.cpu_time_left,0)
+
+### ------- ###
+### DISK    ###
+### ------- ###
 
 class Track(Unit):
+    __slots__ = ("track_number",)
+    # whether this is the head turning around at an edge of the disk rather than a request
+    edge = False
+
     def __init__(self, arrival_time: int, name: str, track_number : int) -> None:
         super().__init__(arrival_time, name)
 
         self.track_number = track_number
-        self.read = False
-    
-    def do_work(self) -> None:
-        self.read = True 
 
-    def finished(self) -> bool:
-        return self.read
+    def start(self) -> "TrackState":
+        return TrackState(self)
 
     @staticmethod
     def parse(csvLine : str) -> Unit :
-        params = csvLine.split(",")
+        return Track.from_fields(csvLine.split(","))
 
+    @staticmethod
+    def from_fields(params : List[str]) -> Unit :
         name = params[0]
         arrival = int(params[1])
         track = int(params[2])
-        return Track(arrival,name,track)
\ No newline at end of file
+        return Track(arrival,name,track)
+
+class EdgeTrack(Track):
+    __slots__ = ()
+    edge = True
+
+    def __init__(self, track_number : int) -> None:
+        """ the head reaching an edge of the disk (e.g. in SCAN), scheduled like a request for that track, 
+            named after it, but not counted as a request """
+        super().__init__(0,str(track_number),track_number)
+
+class TrackState(UnitState):
+    __slots__ = ("track_number","read")
+
+    def __init__(self, unit : Track) -> None:
+        super().__init__(unit)
+        self.track_number = unit.track_number
+        self.read = False
+    
+    def do_work(self, ticks : int = 1) -> None:
+        self.read = True 
+
+    def finished(self) -> bool:
+        return self.read
+
+    def work_left(self) -> int:
+        return 0 if self.read else 1
@@ -0,0 +1,71 @@
+from typing import List
+from random import Random
+from .units import Process, Track
+
+
+def poisson_processes(n : int, seed : int = 0, rate : float = 0.1, burst_alpha : float = 1.5, min_burst : int = 1, 
+        max_burst : int = 10000, priorities : int = 4) -> List[Process]:
+    """ generates processes with poisson arrivals and pareto (heavy tailed) cpu bursts
+
+        Args:
+            n(`int`): number of processes
+            seed(`int`): random seed, equal seeds give equal traces
+            rate(`float`): mean arrivals per time unit
+            burst_alpha(`float`): pareto shape of the bursts, smaller is heavier tailed
+            min_burst(`int`): smallest burst
+            max_burst(`int`): bursts are capped at this
+            priorities(`int`): priorities are drawn uniformly from 1 to this
+    """
+    rng = Random(seed)
+    processes = []
+    arrival = 0.0
+    for i in range(n):
+        burst = min(max_burst,int(min_burst * rng.paretovariate(burst_alpha)))
+        processes.append(Process(int(arrival),"p{}".format(i),burst,priority=rng.randint(1,priorities)))
+        arrival += rng.expovariate(rate)
+    return processes
+
+def disk_tracks(n : int, seed : int = 0, pattern : str = "uniform", low_track : int = 0, high_track : int = 199, 
+        rate : float = 1.0, hot_fraction : float = 0.8, hot_width : float = 0.1, mean_run : int = 16) -> List[Track]:
+    """ generates track requests with poisson arrivals
+
+        Args:
+            n(`int`): number of requests
+            seed(`int`): random seed, equal seeds give equal traces
+            pattern(`str`): one of "uniform", "hotspot" (most requests land in a narrow band) 
+                or "sequential" (runs of consecutive tracks)
+            low_track(`int`): lowest track
+            high_track(`int`): highest track
+            rate(`float`): mean arrivals per time unit
+            hot_fraction(`float`): for hotspot, fraction of requests inside the band
+            hot_width(`float`): for hotspot, width of the band as a fraction of the disk
+            mean_run(`int`): for sequential, mean length of a run
+    """
+    rng = Random(seed)
+    span = high_track - low_track
+    hot_start = rng.randint(low_track,high_track - int(span * hot_width))
+    tracks = []
+    arrival = 0.0
+    run_left = 0
+    track = low_track
+    for i in range(n):
+        if pattern == "uniform":
+            track = rng.randint(low_track,high_track)
+        elif pattern == "hotspot":
+            if rng.random() < hot_fraction:
+                track = hot_start + rng.randint(0,int(span * hot_width))
+            else:
+                track = rng.randint(low_track,high_track)
+        elif pattern == "sequential":
+            if run_left <= 0 or track >= high_track:
+                track = rng.randint(low_track,high_track)
+                run_left = int(rng.expovariate(1 / mean_run)) + 1
+            else:
+                track += 1
+            run_left -= 1
+        else:
+            raise ValueError("unknown track pattern {}".format(pattern))
+
+        tracks.append(Track(int(arrival),"t{}".format(i),track))
+        arrival += rng.expovariate(rate)
+    return tracks
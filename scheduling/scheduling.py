@@ -1,54 +1,102 @@
 from common.input import Mode, Reader
-from common.output import Schedule,TrackSchedule
-from common.units import Process,Track
-from typing import Callable, List, Tuple
+from common.output import EXTENSIONS,FORMATS,MultiprocessorSchedule,RunWriter,Schedule,TrackRunWriter,TrackSchedule,save_summary
+from common.units import EdgeTrack,Process,Track
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Tuple
+from collections.abc import Sequence
 from common.units import Unit
-from itertools import takewhile 
+from common.table import UnitTable
+from common.events import ArrivalQueue, ArrivalStream
+from common.queues import HeapReadyQueue, PriorityLevels, ReadyDeque, ReadyQueue, TrackIndex
+from common.paging import create_page_algorithms
+from common.metrics import LATENCY_METRICS, MetricsCollector
 import sys 
-from copy import deepcopy
+from functools import lru_cache
+from itertools import islice
+from heapq import heapify, heappop, heappush
+from glob import glob
+from time import perf_counter
+from contextlib import nullcontext
 import os
 
-class SchedulingAlgorithm():
-
-    def schedule(self,units : List[Unit]) -> Schedule:
-
-        # simulate process flow
-        arriving_queue = units.copy()
-        ready_queue = []
-        finished_queue = []
-        scheduling_list = []
-        curr_time = 0
-        while len(arriving_queue) + len(ready_queue) > 0:
-
-            # add arriving processes at arrial time
-            new_arriving_queue =[]
-            for u in arriving_queue:
-                if u.arrival_time <= curr_time:
-                    ready_queue.append(u)
-                else:
-                    new_arriving_queue.append(u)
+# the result cache and worker pools are only imported when used, so importing the module as a library stays cheap
+if TYPE_CHECKING:
+    from common.cache import ResultCache
 
-            arriving_queue = new_arriving_queue
+class SchedulingAlgorithm():
 
-            # do fictional work if ready queue non empty
-            if len(ready_queue) > 0:
-                next_unit = self.choose_next(ready_queue)
-                scheduling_list.append(next_unit)
-                next_unit.do_work()
+    def schedule(self,units : Iterable[Unit], collector : MetricsCollector = None) -> Schedule:
+        return self.create_schedule(self.simulate(units,collector))
 
-                if next_unit.finished():
-                    finished_queue.append(next_unit)
+    def create_schedule(self, runs : List[Tuple[int,int,Unit]]) -> Schedule:
+        """ wraps the runs returned by `simulate` in the schedule type of the algorithm """
+        return Schedule(runs)
 
-                    if not next_unit in ready_queue:
-                        # we "created" a unit
-                        pass
-                    else:
-                        ready_queue.remove(next_unit)
+    def create_run_writer(self, path : str) -> RunWriter:
+        """ writer of the runs of the algorithm in the long format, one row per run """
+        return RunWriter(path)
 
-            curr_time += 1
+    def save_runs(self, units : Iterable[Unit], path : str, collector : MetricsCollector = None) -> None:
+        """ schedules the units like `schedule`, but writes each run to the file in the long format as soon as 
+            it is over, instead of keeping the whole schedule in memory """
+        with self.create_run_writer(path) as writer:
+            writer.write_all(self.feed(units,collector))
 
-        return Schedule(scheduling_list)
+    def simulate(self,units : Iterable[Unit], collector : MetricsCollector = None) -> List[Tuple[int,int,Unit]]:
+        """ runs the algorithm over the given units, returns the (start, end, unit) runs it scheduled in time order 
 
+            The units are never modified, each one is given fresh `UnitState` when it arrives which the algorithm 
+            works on instead, so the same units can be scheduled any number of times, also from several threads at once.
+        
+            Args:
+                units(`Iterable[Unit]`): a list of units in any order, or an iterator of units sorted by arrival time which 
+                    is consumed as the simulation reaches each arrival
+                collector(`MetricsCollector`): updated with every run and every unit as it completes, if given
+        """
+        simulation = Simulation(self,self.create_arrival_queue(units),collector)
+        runs = simulation.advance(float('inf'))
+        runs.extend(simulation.finish())
+        return runs
+
+    def online(self, collector : MetricsCollector = None) -> "Simulation":
+        """ starts an incremental simulation with no units, which are then fed to it with `Simulation.submit` 
+            while time is moved forward with `Simulation.advance` """
+        return Simulation(self,ArrivalQueue([]),collector)
+
+    def feed(self, units : Iterable[Unit], collector : MetricsCollector = None) -> Iterator[Tuple[int,int,Unit]]:
+        """ lazily yields the (start, end, unit) runs of the algorithm over units coming from a live feed (e.g. parsed from a pipe 
+            or socket) sorted by arrival time, each run as soon as it is known to be over. 
+            Only the units which have arrived and not finished are kept in memory, however long the feed.
+            A list of units in any order is sorted by arrival time first """
+        if isinstance(units,Sequence):
+            # simultaneous arrivals stay in list order, as in `simulate`
+            units = sorted(units,key=lambda u: u.arrival_time)
+        simulation = self.online(collector)
+        for u in units:
+            yield from simulation.advance(u.arrival_time)
+            simulation.submit(u)
+        yield from simulation.advance(float('inf'))
+        yield from simulation.finish()
+
+    def create_arrival_queue(self, units : Iterable[Unit]) -> ArrivalQueue:
+        """ units still to arrive, a heap for sequences and a lazily consumed stream otherwise """
+        return ArrivalQueue(units) if isinstance(units,Sequence) else ArrivalStream(units)
+
+    def create_ready_queue(self) -> ReadyQueue:
+        """ override this to keep the ready queue in a structure suited to the algorithm, 
+            by default it is a list in arrival order """
+        return ReadyQueue()
+
+    def choose_run(self, units : List[Unit], max_ticks : int) -> Tuple[Unit,int]:
+        """ chooses the next unit and for how many time units it keeps being chosen, given no new arrivals.
+            Must leave the algorithm in the same state as the equivalent number of `choose_next` calls would.
+            
+            Args:
+                units(`List[Unit]`): the ready queue
+                max_ticks(`int`): time units until the next arrival
+            
+            override this for event skipping, the default runs a single time unit
+        """
+        return (self.choose_next(units),1)
 
     def choose_next(self, units : List[Unit]) -> Unit:
         """ override this for specific behaviour """
@@ -58,21 +106,132 @@ class SchedulingAlgorithm():
         """ override this for specific behaviour """ 
         return units
 
+    def held(self) -> List[Unit]:
+        """ the units the algorithm's own state refers to (e.g. a choice it committed to), which must stay in their ready queue
+            while they are unfinished. Units which are not held can be moved to another cpu's queue between decisions.
+            
+            override this for algorithms which remember units between decisions
+        """
+        return []
+
+    def holds(self, unit : Unit) -> bool:
+        """ whether the algorithm's own state refers to the ready unit, see `held` """
+        return any(u is unit for u in self.held())
 
 
+class Simulation():
+    def __init__(self, algorithm : SchedulingAlgorithm, arrivals, collector : MetricsCollector = None) -> None:
+        """ the state of an algorithm scheduling units as time moves forward. Runs are handed out as soon as they are over, 
+            and only the units which are still to arrive or ready are kept, so a simulation can run for any length of time
+            
+            Args:
+                algorithm(`SchedulingAlgorithm`): the algorithm choosing what to run, its state is advanced with the simulation
+                arrivals(`ArrivalQueue` or `ArrivalStream`): the units still to arrive
+                collector(`MetricsCollector`): updated with every run and every unit as it completes, if given
+        """
+        self.algorithm = algorithm
+        self.arrivals = arrivals
+        self.collector = collector
+        self.ready_queue = algorithm.create_ready_queue()
+        # every time unit before this one has been simulated
+        self.time = 0
+        # the latest run, which might continue once time moves on
+        self.last_run : Tuple[int,int,Unit] = None
+
+    def __bool__(self) -> bool:
+        """ whether there are units still to arrive or finish """
+        return bool(self.arrivals) or len(self.ready_queue) > 0
+
+    def submit(self, unit : Unit) -> None:
+        """ adds a unit arriving at or after the current time, raises `ValueError` if it would arrive in the past """
+        if unit.arrival_time < self.time:
+            raise ValueError("unit {} arrives at {}, but the simulation is already at time {}".format(unit,unit.arrival_time,self.time))
+        self.arrivals.push(unit)
+
+    def advance(self, to_time : int) -> List[Tuple[int,int,Unit]]:
+        """ simulates every time unit before the given time, or until all submitted units finish, 
+            returns the (start, end, unit) runs that are over in time order """
+
+        # jump from event to event (arrivals, completions and the ends of runs chosen by the algorithm) 
+        # rather than stepping one time unit at a time
+        algorithm = self.algorithm
+        arriving_queue = self.arrivals
+        ready_queue = self.ready_queue
+        curr_time = self.time
+        last_run = self.last_run
+        collector = self.collector
+        runs = []
+        while curr_time < to_time and (arriving_queue or len(ready_queue) > 0):
+
+            # add arriving processes at arrial time
+            ready_queue.extend([u.start() for u in arriving_queue.pop_arrived(curr_time)])
+
+            # nothing to do until the next arrival
+            if len(ready_queue) == 0:
+                curr_time = min(arriving_queue.next_time(),to_time)
+                continue
+
+            # do fictional work until the next arrival at most
+            max_ticks = min(arriving_queue.next_time() if arriving_queue else to_time,to_time) - curr_time
+            next_unit, ticks = algorithm.choose_run(ready_queue, max_ticks)
+            if last_run is not None and last_run[2] is next_unit.unit and last_run[1] == curr_time - 1:
+                # extend the previous run
+                last_run = (last_run[0],curr_time + ticks - 1,next_unit.unit)
+            else:
+                if last_run is not None:
+                    runs.append(last_run)
+                    if collector is not None and last_run[2] is not next_unit.unit:
+                        collector.context_switch()
+                last_run = (curr_time,curr_time + ticks - 1,next_unit.unit)
+            next_unit.do_work(ticks)
+            ready_queue.update(next_unit)
+            if collector is not None:
+                collector.ran(next_unit,curr_time,ticks)
+
+            if next_unit.finished():
+                if next_unit in ready_queue:
+                    ready_queue.remove(next_unit)
+                if collector is not None:
+                    collector.complete(next_unit,curr_time + ticks - 1)
+
+            curr_time += ticks
+
+        if not (arriving_queue or len(ready_queue) > 0) and to_time != float('inf'):
+            # idle until the given time
+            curr_time = max(curr_time,to_time)
+        self.time = curr_time
+        self.last_run = last_run
+        return runs
+
+    def finish(self) -> List[Tuple[int,int,Unit]]:
+        """ hands out the latest run, once no more units will be submitted before it could continue """
+        runs = [self.last_run] if self.last_run is not None else []
+        self.last_run = None
+        return runs
+
 class NonPreemptiveFCFS(SchedulingAlgorithm):
     def __init__(self) -> None:
         self.last : Unit = None 
 
-    def choose_next(self, units: List[Unit]) -> Unit:
+    def create_ready_queue(self) -> HeapReadyQueue:
+        return HeapReadyQueue(lambda u : u.arrival_time)
+
+    def choose_next(self, units: HeapReadyQueue) -> Unit:
         # commit to first choice
         if self.last and not self.last.finished():
                 return self.last
 
-        # sort units by arrival time
-        sorted_units = sorted(units,key=lambda u : u.arrival_time)
-        self.last = sorted_units[0]
-        return sorted_units[0]
+        # earliest arrival time
+        self.last = units.peek()
+        return self.last
+
+    def choose_run(self, units: HeapReadyQueue, max_ticks: int) -> Tuple[Unit,int]:
+        # the choice sticks until the unit finishes
+        next_unit = self.choose_next(units)
+        return (next_unit, max(1,min(max_ticks,next_unit.work_left())))
+
+    def held(self) -> List[Unit]:
+        return [self.last] if self.last is not None else []
 
 ### ------- ###
 ### PROCESS ###
@@ -81,16 +240,23 @@ class ProcessSchedulingAlgorithm(SchedulingAlgorithm):
     pass 
 
 class PreEmptiveSJF(ProcessSchedulingAlgorithm):
-    def choose_next(self, units: List[Process]) -> Unit:
-        # sort units by cpu time
-        sorted_units = sorted(units,key=lambda u : u.cpu_time_left) 
-        return sorted_units[0]
+    def create_ready_queue(self) -> HeapReadyQueue:
+        return HeapReadyQueue(lambda u : u.cpu_time_left)
+
+    def choose_next(self, units: HeapReadyQueue) -> Unit:
+        # least cpu time left
+        return units.peek()
+
+    def choose_run(self, units: HeapReadyQueue, max_ticks: int) -> Tuple[Unit,int]:
+        # the running process only gets shorter, so it keeps winning until something new arrives
+        next_unit = self.choose_next(units)
+        return (next_unit, max(1,min(max_ticks,next_unit.work_left())))
         
 class NonPreemptiveSJF(PreEmptiveSJF):
     def __init__(self) -> None:
         self.last : Process = None 
 
-    def choose_next(self, units: List[Process]) -> Unit:
+    def choose_next(self, units: HeapReadyQueue) -> Unit:
         # commit to first choice
         if self.last and not self.last.finished():
                 return self.last 
@@ -98,6 +264,9 @@ class NonPreemptiveSJF(PreEmptiveSJF):
         self.last = super().choose_next(units)
         return self.last
 
+    def held(self) -> List[Unit]:
+        return [self.last] if self.last is not None else []
+
 class RoundRobin(ProcessSchedulingAlgorithm):
     def __init__(self, quantum : int, on_preempt : Callable[[Process],None] = None) -> None:
         self.quantum = quantum
@@ -105,7 +274,13 @@ class RoundRobin(ProcessSchedulingAlgorithm):
         self.current : Process = None
         self.on_preempt = on_preempt
 
-    def choose_next(self, units: List[Process]) -> Unit:
+    def create_ready_queue(self) -> ReadyDeque:
+        return ReadyDeque()
+
+    def choose_next(self, units: ReadyDeque) -> Unit:
+        return self.choose_run(units,1)[0]
+
+    def choose_run(self, units: ReadyDeque, max_ticks: int) -> Tuple[Unit,int]:
         # pre timestep
 
         if self.current and self.current.finished():
@@ -116,27 +291,31 @@ class RoundRobin(ProcessSchedulingAlgorithm):
             self.current = units[0]
             self.schedules_left = self.quantum
 
-
-        # timestep
+        # run until the quantum expires, the process finishes or something arrives
         next = self.current
-        if self.schedules_left - 1 <= 0:
+        ticks = max(1,min(max_ticks,next.work_left(),self.schedules_left))
+        if self.schedules_left - ticks <= 0:
             if self.on_preempt:
                 self.on_preempt(self.current)
             self.order_ready(units,self.current)
             self.current = None
 
         # post timestep
-        self.schedules_left -= 1
-        
-        return next
+        self.schedules_left -= ticks
+
+        return (next,ticks)
 
     def reset(self):
         self.current = None 
         self.schedules_left = self.quantum
 
-    def order_ready(self, units: List[Unit], chosen: Unit) -> List[Unit]:
-        units.remove(chosen)
-        units.append(chosen)
+    def held(self) -> List[Unit]:
+        return [self.current] if self.current is not None else []
+
+    def order_ready(self, units: ReadyDeque, chosen: Unit) -> ReadyDeque:
+        # the current process is always at the front, so this is a rotation
+        units.move_to_back(chosen)
+        return units
 
 class MultipleQueuesFlipOnHighPreempt(ProcessSchedulingAlgorithm):
     def __init__(self, quantum : int) -> None:
@@ -145,63 +324,72 @@ class MultipleQueuesFlipOnHighPreempt(ProcessSchedulingAlgorithm):
         self.last_priority = None
         self.last = None
 
-    def choose_next(self, units: List[Process]) -> Unit:
+    def create_ready_queue(self) -> PriorityLevels:
+        return PriorityLevels()
+
+    def choose_next(self, units: PriorityLevels) -> Unit:
+        return self.choose_run(units,1)[0]
+
+    def choose_run(self, units: PriorityLevels, max_ticks: int) -> Tuple[Unit,int]:
         
-        # sort by priority, sort is stable, so arrival order for processes with equal 
-        # priority 
-        units.sort(key=lambda u:u.priority)
+        # each priority has its own queue in arrival order 
+        highest_priority = units.highest()
 
         # if priority hasn't been scheduled before, initialize the RR scheduler 
-        highest_priority = units[0].priority
-        rr : RoundRobin = self.queues.setdefault(highest_priority,RoundRobin(self.quantum))
+        if highest_priority not in self.queues:
+            self.queues[highest_priority] = RoundRobin(self.quantum)
+        rr : RoundRobin = self.queues[highest_priority]
         
         # if we preempted a lower priority, push the front of that queue to back
         if self.last_priority and highest_priority < self.last_priority and self.last and not self.last.finished():
             rr_preempted = self.queues.get(self.last_priority)
-            # put it at back of its priority queue via stable sorting trick
-            units.remove(self.last)
-            units.append(self.last)
-            units.sort(key=lambda u:u.priority)
+            units.level(self.last_priority).move_to_back(self.last)
             rr_preempted.reset()
 
-        # pick subset of the queue corresponding to current priority
-        highest_queue = list(takewhile(lambda u: u.priority == highest_priority, units))
-        
         # perform round robin scheduling on highest priority,
-        # this will possibly have side effects on the queue
-        # feed those back into aggregated queue
-        next_unit = rr.choose_next(highest_queue)
-        units[0:len(highest_queue)] = highest_queue
+        # this will possibly have side effects on its queue
+        next_unit, ticks = rr.choose_run(units.level(highest_priority),max_ticks)
         self.last = next_unit
         self.last_priority = highest_priority
 
-        return next_unit
+        return (next_unit,ticks)
+
+    def held(self) -> List[Unit]:
+        held = [u for rr in self.queues.values() for u in rr.held()]
+        if self.last is not None:
+            held.append(self.last)
+        return held
 
 class MultipleQueuesFreezeOnHighPreempt(ProcessSchedulingAlgorithm):
     def __init__(self, quantum : int) -> None:
         self.queues = {}
         self.quantum = quantum
 
-    def choose_next(self, units: List[Process]) -> Unit:
+    def create_ready_queue(self) -> PriorityLevels:
+        return PriorityLevels()
+
+    def choose_next(self, units: PriorityLevels) -> Unit:
+        return self.choose_run(units,1)[0]
+
+    def choose_run(self, units: PriorityLevels, max_ticks: int) -> Tuple[Unit,int]:
         
-        # sort by priority, sort is stable, so arrival order for processes with equal 
-        # priority 
-        units.sort(key=lambda u:u.priority)
+        # each priority has its own queue in arrival order 
+        highest_priority = units.highest()
 
         # if priority hasn't been scheduled before, initialize the RR scheduler 
-        highest_priority = units[0].priority
-        rr : RoundRobin = self.queues.setdefault(highest_priority,RoundRobin(self.quantum))
-        
-        # pick subset of the queue corresponding to current priority
-        highest_queue = list(takewhile(lambda u: u.priority == highest_priority, units))
+        if highest_priority not in self.queues:
+            self.queues[highest_priority] = RoundRobin(self.quantum)
+        rr : RoundRobin = self.queues[highest_priority]
         
         # perform round robin scheduling on highest priority,
-        # this will possibly have side effects on the queue
-        # feed those back into aggregated queue
-        next_unit = rr.choose_next(highest_queue)
-        units[0:len(highest_queue)] = highest_queue
+        # this will possibly have side effects on its queue
+        next_unit, ticks = rr.choose_run(units.level(highest_priority),max_ticks)
 
-        return next_unit
+        return (next_unit,ticks)
+
+    def held(self) -> List[Unit]:
+        # round robin levels frozen by a higher priority arrival still hold the unit they were running
+        return [u for rr in self.queues.values() for u in rr.held()]
 
 class MultilevelFeedbackQueue(ProcessSchedulingAlgorithm):
     def __init__(self, quantum_function : Callable[[int],int]) -> None:
@@ -212,54 +400,62 @@ class MultilevelFeedbackQueue(ProcessSchedulingAlgorithm):
     def on_preempt(self,p : Process):
         self.preempted = p
 
-    def choose_next(self, units: List[Process]) -> Unit:
-        # sort by priority, sort is stable, so arrival order for processes with equal 
-        # priority 
-        units.sort(key=lambda u:u.priority)
+    def create_ready_queue(self) -> PriorityLevels:
+        return PriorityLevels()
+
+    def choose_next(self, units: PriorityLevels) -> Unit:
+        return self.choose_run(units,1)[0]
+
+    def choose_run(self, units: PriorityLevels, max_ticks: int) -> Tuple[Unit,int]:
+        # each priority has its own queue in arrival order 
+        highest_priority = units.highest()
 
         # if priority hasn't been scheduled before, initialize the RR scheduler 
-        highest_priority = units[0].priority
-        rr : RoundRobin = self.queues.setdefault(highest_priority,
-            RoundRobin(self.quantum_function(highest_priority),on_preempt=self.on_preempt))
+        if highest_priority not in self.queues:
+            self.queues[highest_priority] = RoundRobin(self.quantum_function(highest_priority),on_preempt=self.on_preempt)
+        rr : RoundRobin = self.queues[highest_priority]
 
-        # pick subset of the queue corresponding to current priority
-        highest_queue = list(takewhile(lambda u: u.priority == highest_priority, units))
-        
         # perform round robin scheduling on highest priority,
-        # this will possibly have side effects on the queue
-        # feed those back into aggregated queue
+        # this will possibly have side effects on its queue
         self.preempted = None 
-        next_unit = rr.choose_next(highest_queue)
-
-
-        units[0:len(highest_queue)] = highest_queue
+        next_unit, ticks = rr.choose_run(units.level(highest_priority),max_ticks)
 
         # check if the last process needs to get booted to the next queue
         if self.preempted:
-            # if so, boot it
+            # if so, boot it to the tail of the lower priority queue
             self.preempted.priority += 1
-            # re-sort, since it was higher up in the list, and relative ordering gets preserved,
-            # it will be placed at the head of the lower priority queue, but we want it at the tail, so add infinity when sorting 
-            # the last element
-            units.sort(key=lambda u:u.priority if u != self.preempted else float('inf'))
+            units.move(self.preempted)
             rr.reset()
 
 
-        return next_unit
+        return (next_unit,ticks)
+
+    def held(self) -> List[Unit]:
+        return [u for rr in self.queues.values() for u in rr.held()]
 
 class Priority(ProcessSchedulingAlgorithm):
     def __init__(self) -> None:
         self.last : Process = None 
 
-    def choose_next(self, units: List[Unit]) -> Unit:
+    def create_ready_queue(self) -> HeapReadyQueue:
+        return HeapReadyQueue(lambda u : u.priority)
+
+    def choose_next(self, units: HeapReadyQueue) -> Unit:
         # commit to first choice
         if self.last and not self.last.finished():
                 return self.last
 
-        # sort units by arrival time
-        sorted_units = sorted(units,key=lambda u : u.priority)
-        self.last = sorted_units[0]
-        return sorted_units[0]
+        # best priority
+        self.last = units.peek()
+        return self.last
+
+    def choose_run(self, units: HeapReadyQueue, max_ticks: int) -> Tuple[Unit,int]:
+        # the choice sticks until the unit finishes
+        next_unit = self.choose_next(units)
+        return (next_unit, max(1,min(max_ticks,next_unit.work_left())))
+
+    def held(self) -> List[Unit]:
+        return [self.last] if self.last is not None else []
 
 ### ------- ###
 ### PROCESS ###
@@ -279,49 +475,53 @@ class TrackSchedulingAlgorithm(SchedulingAlgorithm):
         self.low_track  = low_track
         self.high_track = high_track
 
-    def schedule(self, units: List[Unit]) -> Schedule:
-        schedule = super().schedule(units)
-        list_s : List= schedule.schedule_list 
+    def create_ready_queue(self) -> TrackIndex:
+        return TrackIndex()
+
+    def create_schedule(self, runs: List[Tuple[int,int,Unit]]) -> Schedule:
         start_pos = Track(0,str(self.start_head_position),self.start_head_position)
-        list_s.insert(0,start_pos)
-        return TrackSchedule(list_s) # change output formating
+        return TrackSchedule(runs,start_pos) # change output formating
+
+    def create_run_writer(self, path: str) -> RunWriter:
+        return TrackRunWriter(path,Track(0,str(self.start_head_position),self.start_head_position))
 
 class ShortestSeekTimeFirst(TrackSchedulingAlgorithm):
-    def choose_next(self, units: List[Unit]) -> Unit:
-        # sort according to distance from head position
-        curr_head_pos = self.head_position
-        sorted_units = sorted(units,key=lambda u:abs(u.track_number - curr_head_pos))
-        self.head_position = sorted_units[0].track_number
+    def choose_next(self, units: TrackIndex) -> Unit:
+        # closest to head position
+        next_unit = units.nearest(self.head_position)
+        self.head_position = next_unit.track_number
         
-        return sorted_units[0]
+        return next_unit
 
 class FCFSDisk(TrackSchedulingAlgorithm):
-    def choose_next(self, units: List[Unit]) -> Unit:
-        return units[0]
+    def choose_next(self, units: TrackIndex) -> Unit:
+        return units.first()
 
 class SCAN(TrackSchedulingAlgorithm):
-    def choose_next(self, units: List[Unit]) -> Unit:
+    def choose_next(self, units: TrackIndex) -> Unit:
+        return self.sweep(units)
+
+    def sweep(self, units: TrackIndex) -> Unit:
+        """ the next stop of the head sweeping from edge to edge over the given tracks """
         curr_direction = self.last_direction
         
 
-        # get only those tracks in direction we're looking for
-        nUnits = [x for x in units if (x.track_number - self.head_position) * curr_direction >= 0 ]
-        if len(nUnits) == 0:
+        # closest of those tracks in direction we're looking for
+        next_unit = units.nearest_in_direction(self.head_position,curr_direction)
+        if next_unit is None:
             # if reached the edge, reverse direction and go to edge track
             self.last_direction *= -1
             if curr_direction == -1:
                 self.head_position = self.low_track
-                return Track(0,str(self.low_track),self.low_track)
+                return EdgeTrack(self.low_track).start()
             else:
                 self.head_position = self.high_track
-                return Track(0,str(self.high_track),self.high_track)
+                return EdgeTrack(self.high_track).start()
 
 
         else:
-            # sort them by distance to head 
-            nUnits.sort(key= lambda x : abs(x.track_number - self.head_position))
-            self.head_position = nUnits[0].track_number
-            return nUnits[0]
+            self.head_position = next_unit.track_number
+            return next_unit
 
 class CSCAN(TrackSchedulingAlgorithm):
    def __init__(self, low_track: int, high_track: int, start_head_position: int, last_direction: int) -> None:
@@ -329,7 +529,7 @@ class CSCAN(TrackSchedulingAlgorithm):
 
        self.servicing = True
 
-   def choose_next(self, units: List[Unit]) -> Unit:
+   def choose_next(self, units: TrackIndex) -> Unit:
         curr_direction = self.last_direction
         
         # if skipping to start position
@@ -337,40 +537,966 @@ class CSCAN(TrackSchedulingAlgorithm):
             self.servicing = True
             if curr_direction == -1:
                 self.head_position = self.high_track
-                return Track(0,str(self.high_track),self.high_track)
+                return EdgeTrack(self.high_track).start()
             else:
                 self.head_position = self.low_track
-                return Track(0,str(self.low_track),self.low_track)
+                return EdgeTrack(self.low_track).start()
 
-        # get only those tracks in direction we're looking for
-        nUnits = [x for x in units if (x.track_number - self.head_position) * curr_direction >= 0 ]
-        if len(nUnits) == 0:
+        # closest of those tracks in direction we're looking for
+        next_unit = units.nearest_in_direction(self.head_position,curr_direction)
+        if next_unit is None:
             # if reached edge, move to it, then next time start on other edge with same direction
             self.servicing = False
             if curr_direction == -1:
                 self.head_position = self.low_track
-                return Track(0,str(self.low_track),self.low_track)
+                return EdgeTrack(self.low_track).start()
             else:
                 self.head_position = self.high_track
-                return Track(0,str(self.high_track),self.high_track)
+                return EdgeTrack(self.high_track).start()
 
 
         else:
-            # sort them by distance to head 
-            nUnits.sort(key= lambda x : abs(x.track_number - self.head_position))
-            self.head_position = nUnits[0].track_number
-            return nUnits[0]
+            self.head_position = next_unit.track_number
+            return next_unit
+
+class LOOK(TrackSchedulingAlgorithm):
+    def choose_next(self, units: TrackIndex) -> Unit:
+        # like SCAN, but turns around at the last track in the direction of travel rather than at the edge
+        next_unit = units.nearest_in_direction(self.head_position,self.last_direction)
+        if next_unit is None:
+            self.last_direction *= -1
+            next_unit = units.nearest_in_direction(self.head_position,self.last_direction)
+
+        self.head_position = next_unit.track_number
+        return next_unit
+
+class CLOOK(TrackSchedulingAlgorithm):
+    def choose_next(self, units: TrackIndex) -> Unit:
+        # like C-SCAN, but jumps straight from the last track in the direction of travel to the furthest track 
+        # the other way, and sweeps on in the same direction
+        next_unit = units.nearest_in_direction(self.head_position,self.last_direction)
+        if next_unit is None:
+            next_unit = units.furthest(-self.last_direction)
+
+        self.head_position = next_unit.track_number
+        return next_unit
+
+class NStepSCAN(SCAN):
+    def __init__(self, low_track: int, high_track: int, start_head_position: int, last_direction: int, n : int) -> None:
+        """ SCAN over batches of the n earliest waiting requests, requests arriving during a sweep wait for a later batch 
+            so they cannot hold the head in place, every waiting request forms the batch if n is None """
+        if n is not None and n < 1:
+            raise ValueError("N-step SCAN needs batches of at least 1 request, not {}".format(n))
+        super().__init__(low_track, high_track, start_head_position, last_direction)
+        self.n = n
+        self.batch = TrackIndex()
+
+    def choose_next(self, units: TrackIndex) -> Unit:
+        if len(self.batch) == 0:
+            # served requests have left the ready queue, so its earliest requests are the next batch
+            self.batch.extend(islice(units,self.n))
+
+        next_unit = self.sweep(self.batch)
+        if next_unit in self.batch:
+            self.batch.remove(next_unit)
+        return next_unit
+
+class FSCAN(NStepSCAN):
+    def __init__(self, low_track: int, high_track: int, start_head_position: int, last_direction: int) -> None:
+        """ SCAN over every request waiting when the sweep starts, those arriving during it wait for the next one """
+        super().__init__(low_track, high_track, start_head_position, last_direction, None)
 
 ### ------- ###
 ### DISK    ###
 ### ------- ###
+
+### ------- ###
+### SMP     ###
+### ------- ###
+
+# ways of moving waiting units between cpus, see `MultiprocessorSimulation`
+BALANCING = ["steal","periodic","both","none"]
+DEFAULT_BALANCE_PERIOD = 10
+
+class CPU():
+    __slots__ = ("index","algorithm","ready_queue","arrivals","running","last_run","next_event","idle","free")
+
+    def __init__(self, index : int, algorithm : SchedulingAlgorithm, arrivals : ArrivalQueue) -> None:
+        """ one processor of a `MultiprocessorSimulation`, with its own instance of the policy and its own ready queue """
+        self.index = index
+        self.algorithm = algorithm
+        self.ready_queue = algorithm.create_ready_queue()
+        # units placed on this cpu which are still to arrive
+        self.arrivals = arrivals
+        # the unit of the latest run, which may not move to another cpu until the next decision
+        self.running = None
+        self.last_run : Tuple[int,int,Unit] = None
+        # time of the next decision, None while the cpu waits for work
+        self.next_event : int = None
+        self.idle = False
+        # number of units in the ready queue without affinity, kept up to date as units come and go
+        self.free = 0
+
+    def pinned(self) -> set:
+        """ the waiting units without affinity which cannot move either, the running one and those held by the policy """
+        pinned = {s for s in self.algorithm.held() if s.unit.affinity is None and not s.finished()}
+        if self.running is not None and self.running.unit.affinity is None:
+            pinned.add(self.running)
+        return pinned
+
+    def movable_count(self) -> int:
+        """ the number of waiting units which can be moved to another cpu """
+        return self.free - len(self.pinned())
+
+    def movable(self, count : int = None) -> List[Unit]:
+        """ the last `count` waiting units (all of them if None) which can be moved to another cpu, in ready queue order. 
+            The ready queue is searched from the back, so only as many units are looked at as needed """
+        pinned = self.pinned()
+        found = []
+        for s in reversed(self.ready_queue):
+            if count is not None and len(found) == count:
+                break
+            if s.unit.affinity is None and s not in pinned:
+                found.append(s)
+        found.reverse()
+        return found
+
+class MultiprocessorSimulation():
+    def __init__(self, policy : Callable[[],SchedulingAlgorithm], cpus : int, balancing : str = "steal", 
+            period : int = DEFAULT_BALANCE_PERIOD) -> None:
+        """ schedules processes over several cpus, each cpu has its own ready queue and its own instance of the policy, 
+            which can be any of the single cpu algorithms, and decides what it runs independently of the others.
+
+            Processes are placed on the cpu they have affinity with, or dealt out over the cpus in arrival order, 
+            and the ones without affinity are moved around by load balancing:
+                steal: a cpu which runs out of work takes the later half of the movable units of the cpu with most of them
+                periodic: every `period` time units, movable units go from the cpus with more than their share of units 
+                    to those with less
+                both: stealing and periodic balancing
+                none: units stay where they were placed
+            A unit never moves while its cpu is running it, or while the policy still refers to it (see `SchedulingAlgorithm.held`).
+            With a single cpu the schedule is the same as that of the policy on its own.
+
+            Only cpus with something to decide are visited, in the order of their next decision (the end of their current run, 
+            the next arrival on them or the next balancing). When stealing, the number of movable units of each cpu is recorded 
+            in a heap after every change to it, so a thief goes straight to its victim, and units to move are looked for 
+            from the back of a ready queue only until there are enough of them.
+
+            Args:
+                policy(`Callable[[],SchedulingAlgorithm]`): creates the algorithm of each cpu
+                cpus(`int`): number of cpus
+                balancing(`str`): one of `BALANCING`
+                period(`int`): time units between periodic balancing
+        """
+        if cpus < 1:
+            raise ValueError("need at least one cpu, not {}".format(cpus))
+        if balancing not in BALANCING:
+            raise ValueError("balancing must be one of {}, not {}".format(BALANCING,balancing))
+        if period < 1:
+            raise ValueError("the balancing period must be at least 1, not {}".format(period))
+        self.policy = policy
+        self.cpus = cpus
+        self.stealing = balancing in ("steal","both")
+        self.periodic = balancing in ("periodic","both")
+        self.period = period
+        # number of units moved between cpus by the latest simulation
+        self.migrations = 0
+
+    def schedule(self, units : Iterable[Unit], collector : MetricsCollector = None) -> MultiprocessorSchedule:
+        return MultiprocessorSchedule(self.simulate(units,collector),self.cpus)
+
+    def place(self, units : Iterable[Unit]) -> List[List[Unit]]:
+        """ returns the units placed on each cpu, those without affinity go to the cpus in turn in arrival order """
+        units = sorted(units,key=lambda u: u.arrival_time)
+        placed = [[] for _ in range(self.cpus)]
+        turn = 0
+        for u in units:
+            cpu = u.affinity
+            if cpu is None:
+                cpu = turn
+                turn = (turn + 1) % self.cpus
+            elif not 0 <= cpu < self.cpus:
+                raise ValueError("unit {} has affinity with cpu {}, but there are only {} cpus".format(u,cpu,self.cpus))
+            placed[cpu].append(u)
+        return placed
+
+    def simulate(self, units : Iterable[Unit], collector : MetricsCollector = None) -> List[Tuple[int,int,Unit,int]]:
+        """ runs the policy on every cpu over the given units, returns the (start, end, unit, cpu) runs ordered by start time, 
+            then cpu. Like `SchedulingAlgorithm.simulate`, the units themselves are never modified, and the collector 
+            if given is updated with every run and every unit as it completes, context switches are counted per cpu """
+        cpus = [CPU(i,self.policy(),ArrivalQueue(p)) for (i,p) in enumerate(self.place(units))]
+        self.migrations = 0
+        unfinished = sum(len(c.arrivals) for c in cpus)
+
+        # (time, cpu index) of the next decision of every cpu, entries made stale by a cpu being woken early are skipped.
+        # Balancing comes first among simultaneous events, as cpu index -1
+        events = []
+        for c in cpus:
+            if c.arrivals:
+                c.next_event = c.arrivals.next_time()
+                events.append((c.next_event,c.index))
+        inf = float('inf')
+        next_balance = inf
+        if self.periodic and events:
+            next_balance = self.period
+            events.append((next_balance,-1))
+        heapify(events)
+
+        # state shared with the balancing, (-movable units, cpu index) of the cpus with movable units and the indices of idle cpus, 
+        # both heaps are checked against the cpus when popped
+        self._cpus = cpus
+        self._events = events
+        self._loads = []
+        self._idle = []
+        runs = []
+
+        while events:
+            (now,i) = heappop(events)
+            if i < 0:
+                if unfinished == 0:
+                    continue
+                self._balance(now)
+                next_balance = now + self.period
+                if not any(len(c.ready_queue) for c in cpus):
+                    # every cpu waits for arrivals, skip the periods before the next one
+                    first = min(c.arrivals.next_time() for c in cpus if c.arrivals)
+                    next_balance = max(next_balance,now + self.period * -(-(first - now) // self.period))
+                heappush(events,(next_balance,-1))
+                continue
+            cpu = cpus[i]
+            if cpu.next_event != now:
+                continue
+            cpu.running = None
+            ready_queue = cpu.ready_queue
+
+            arrived = cpu.arrivals.pop_arrived(now)
+            if arrived:
+                ready_queue.extend([u.start() for u in arrived])
+                cpu.free += sum(u.affinity is None for u in arrived)
+                self._loaded(cpu)
+                if len(ready_queue) > 1:
+                    self._wake(now)
+
+            if len(ready_queue) == 0 and self.stealing:
+                self._steal(cpu,now)
+
+            # nothing to do until the next arrival, or until woken
+            if len(ready_queue) == 0:
+                cpu.next_event = cpu.arrivals.next_time() if cpu.arrivals else None
+                if cpu.next_event is not None:
+                    heappush(events,(cpu.next_event,i))
+                if not cpu.idle:
+                    cpu.idle = True
+                    heappush(self._idle,i)
+                continue
+            cpu.idle = False
+
+            # run until the next arrival on this cpu or the next balancing at most
+            max_ticks = min(cpu.arrivals.next_time() if cpu.arrivals else inf,next_balance) - now
+            next_unit, ticks = cpu.algorithm.choose_run(ready_queue,max_ticks)
+            last_run = cpu.last_run
+            if last_run is not None and last_run[2] is next_unit.unit and last_run[1] == now - 1:
+                cpu.last_run = (last_run[0],now + ticks - 1,next_unit.unit)
+            else:
+                if last_run is not None:
+                    runs.append(last_run + (i,))
+                    if collector is not None and last_run[2] is not next_unit.unit:
+                        collector.context_switch()
+                cpu.last_run = (now,now + ticks - 1,next_unit.unit)
+            next_unit.do_work(ticks)
+            ready_queue.update(next_unit)
+            if collector is not None:
+                collector.ran(next_unit,now,ticks)
+
+            if next_unit.finished():
+                if next_unit in ready_queue:
+                    ready_queue.remove(next_unit)
+                    cpu.free -= next_unit.unit.affinity is None
+                unfinished -= 1
+                if collector is not None:
+                    collector.complete(next_unit,now + ticks - 1)
+            else:
+                cpu.running = next_unit
+            self._loaded(cpu)
+
+            cpu.next_event = now + ticks
+            heappush(events,(cpu.next_event,i))
+
+        for c in cpus:
+            if c.last_run is not None:
+                runs.append(c.last_run + (c.index,))
+        self._cpus = self._events = None
+        runs.sort(key=lambda r: (r[0],r[3]))
+        return runs
+
+    def _loaded(self, cpu : CPU) -> None:
+        """ records the number of movable units of the cpu after its units or its policy changed """
+        if not self.stealing:
+            return
+        if len(cpu.ready_queue) > 1:
+            count = cpu.movable_count()
+            if count > 0:
+                heappush(self._loads,(-count,cpu.index))
+        # entries go stale with every change, rebuild the heap from the cpus once they dominate it
+        if len(self._loads) > 2 * self.cpus + 1024:
+            self._loads = [(-c.movable_count(),c.index) for c in self._cpus if len(c.ready_queue) > 1]
+            self._loads = [e for e in self._loads if e[0] < 0]
+            heapify(self._loads)
+
+    def _wake_at(self, cpu : CPU, now : int) -> None:
+        """ makes the cpu decide again at the given time """
+        cpu.idle = False
+        if cpu.next_event != now:
+            cpu.next_event = now
+            heappush(self._events,(now,cpu.index))
+
+    def _wake(self, now : int) -> None:
+        """ wakes the lowest idle cpu, if any, so it can steal work """
+        if not self.stealing:
+            return
+        while self._idle:
+            cpu = self._cpus[heappop(self._idle)]
+            if cpu.idle:
+                self._wake_at(cpu,now)
+                return
+
+    def _steal(self, thief : CPU, now : int) -> None:
+        """ moves the later half of the movable units of the cpu with most of them to the idle thief """
+        loads = self._loads
+        while loads:
+            (load,i) = heappop(loads)
+            victim = self._cpus[i]
+            # every change to a cpu records it again, so entries which no longer match it are dropped
+            if victim is thief or len(victim.ready_queue) < 2 or -load != victim.movable_count():
+                continue
+            taken = victim.movable(-load - (-load // 2))
+
+            # removing from the back is cheapest for the deque based queues
+            for s in reversed(taken):
+                victim.ready_queue.remove(s)
+            thief.ready_queue.extend(taken)
+            victim.free -= len(taken)
+            thief.free += len(taken)
+            self.migrations += len(taken)
+            self._loaded(victim)
+            self._loaded(thief)
+            # pass the remaining work on to the next idle cpu
+            if len(victim.ready_queue) > 1:
+                self._wake(now)
+            return
+
+    def _balance(self, now : int) -> None:
+        """ evens out the number of units on each cpu, moving movable units from those with more than their share to those with least """
+        cpus = self._cpus
+        share = -(-sum(len(c.ready_queue) for c in cpus) // len(cpus))
+        receivers = [(len(c.ready_queue),c.index) for c in cpus if len(c.ready_queue) < share]
+        heapify(receivers)
+        for donor in sorted(cpus,key=lambda c: -len(c.ready_queue)):
+            surplus = len(donor.ready_queue) - share
+            if surplus <= 0 or not receivers:
+                break
+            for s in reversed(donor.movable(surplus)):
+                if not receivers:
+                    break
+                (load,r) = heappop(receivers)
+                receiver = cpus[r]
+                donor.ready_queue.remove(s)
+                receiver.ready_queue.append(s)
+                donor.free -= 1
+                receiver.free += 1
+                self.migrations += 1
+                if load + 1 < share:
+                    heappush(receivers,(load + 1,r))
+                # the receiver may have been waiting for work
+                self._wake_at(receiver,now)
+                self._loaded(receiver)
+            self._loaded(donor)
+
+def parse_balancing(spec : str) -> Tuple[str,int]:
+    """ parses a KIND[:PERIOD] balancing option into the kind, one of `BALANCING`, and the period """
+    (kind,_,period) = spec.partition(":")
+    if kind not in BALANCING:
+        raise ValueError("balancing must be one of {}, not {}".format(BALANCING,kind))
+    return (kind,int(period) if period else DEFAULT_BALANCE_PERIOD)
+
+def run_multiprocessor(mode : Mode, params : tuple, path : str, out_dir : str, cpus : int, balancing : str = "steal", 
+        period : int = DEFAULT_BALANCE_PERIOD, output_format : str = "wide") -> int:
+    """ runs every algorithm of `create_algorithms(mode,*params)` as the per cpu policy of a `MultiprocessorSimulation`,
+        saving each schedule to the output directory, returns the number of units moved between cpus over all algorithms """
+    table = Reader().read_table(mode,path)
+    migrations = 0
+    for (i,(f,_)) in enumerate(create_algorithms(mode,*params)):
+        simulation = MultiprocessorSimulation(lambda i=i: create_algorithms(mode,*params)[i][1],cpus,balancing,period)
+        simulation.schedule(table.units()).save(out_dir,f + EXTENSIONS[output_format],output_format)
+        migrations += simulation.migrations
+    return migrations
+
+### ------- ###
+### SMP     ###
+### ------- ###
+
+# named MultilevelFeedbackQueue quantum policies, each maps the round robin quantum to the function 
+# giving the quantum of each priority level
+MLFQ_POLICIES : Dict[str,Callable[[int],Callable[[int],int]]] = {
+    "exponential" : lambda q : lambda p : 2 **(p-1),
+    "linear" : lambda q : lambda p : p,
+    "constant" : lambda q : lambda p : q,
+    "scaled" : lambda q : lambda p : q * 2 **(p-1),
+}
+# policies which do not depend on the round robin quantum
+MLFQ_QUANTUM_FREE_POLICIES = {"exponential","linear"}
+# requests per batch of N-step SCAN
+DEFAULT_NSTEP = 10
+
+# parameters taken by the algorithms and their defaults, see `create_algorithm`
+DEFAULT_PARAMS = {
+    "quantum" : 1,
+    "head_min" : 0,
+    "head_max" : 199,
+    "head_init" : 0,
+    "head_dir" : 1,
+    "mlfq_policy" : "exponential",
+    "nstep" : DEFAULT_NSTEP,
+}
+_HEAD_PARAMS = ("head_min","head_max","head_init","head_dir")
+
+# every algorithm by mode and name, as the function creating it and the parameters passed to that function in order.
+# The algorithms of a mode are compared in this order
+ALGORITHMS : Dict[Mode,Dict[str,Tuple[Callable[...,SchedulingAlgorithm],Tuple[str,...]]]] = {
+    Mode.PROCESS : {
+        "FirstComeFirstServed" : (NonPreemptiveFCFS,()),
+        "ShortestJobFirst" : (NonPreemptiveSJF,()),
+        "ShortestRemainingTimeFirst" : (PreEmptiveSJF,()),
+        "RoundRobin" : (RoundRobin,("quantum",)),
+        "Priority" : (Priority,()),
+        "MultipleQueuesFlipOnHighPreempt" : (MultipleQueuesFlipOnHighPreempt,("quantum",)),
+        "MultipleQueuesFreezeOnHighPreempt" : (MultipleQueuesFreezeOnHighPreempt,("quantum",)),
+        "MultiLevelFeedbackQueue" : (lambda quantum, mlfq_policy : MultilevelFeedbackQueue(MLFQ_POLICIES[mlfq_policy](quantum)),("quantum","mlfq_policy")),
+    },
+    Mode.DISK : {
+        "FirstComeFirstServed" : (FCFSDisk,_HEAD_PARAMS),
+        "ShortestSeekTimeFirst" : (ShortestSeekTimeFirst,_HEAD_PARAMS),
+        "SCAN" : (SCAN,_HEAD_PARAMS),
+        "C-SCAN" : (CSCAN,_HEAD_PARAMS),
+        "LOOK" : (LOOK,_HEAD_PARAMS),
+        "C-LOOK" : (CLOOK,_HEAD_PARAMS),
+        "N-Step-SCAN" : (NStepSCAN,_HEAD_PARAMS + ("nstep",)),
+        "FSCAN" : (FSCAN,_HEAD_PARAMS),
+    },
+}
+
+def create_algorithm(name : str, mode : Mode = Mode.PROCESS, **params) -> SchedulingAlgorithm:
+    """ creates the named algorithm of the mode, parameters which are not given take their `DEFAULT_PARAMS`, those of 
+        `DEFAULT_PARAMS` the algorithm does not take (see `ALGORITHMS`) are ignored, so one set of parameters fits every 
+        algorithm. Raises `ValueError` for unknown algorithms, unknown parameters and unknown mlfq policies 
+        
+        e.g. `create_algorithm("RoundRobin",quantum=4)` or `create_algorithm("LOOK",Mode.DISK,head_init=53)`
+    """
+    registered = ALGORITHMS.get(mode,{})
+    if name not in registered:
+        raise ValueError("there is no {} algorithm named {}, it is one of {}".format(mode.name.lower(),name,list(registered)))
+    (factory,names) = registered[name]
+    unknown = sorted(set(params) - set(DEFAULT_PARAMS))
+    if unknown:
+        raise ValueError("unknown parameters {}, they are some of {}".format(unknown,list(DEFAULT_PARAMS)))
+    if params.get("mlfq_policy",DEFAULT_PARAMS["mlfq_policy"]) not in MLFQ_POLICIES:
+        raise ValueError("mlfq_policy must be one of {}".format(list(MLFQ_POLICIES)))
+    return factory(*[params.get(p,DEFAULT_PARAMS[p]) for p in names])
+
+def create_algorithms(mode : Mode, quantum : int = 1, head_min : int = 0, head_max : int = 199, head_init : int = 0, head_dir : int = 1,
+        mlfq_policy : str = "exponential", nstep : int = DEFAULT_NSTEP) -> List[Tuple[str,SchedulingAlgorithm]]:
+    """ returns the (name, algorithm) pairs to compare for the given mode """
+    params = {
+        "quantum" : quantum,
+        "head_min" : head_min,
+        "head_max" : head_max,
+        "head_init" : head_init,
+        "head_dir" : head_dir,
+        "mlfq_policy" : mlfq_policy,
+        "nstep" : nstep,
+    }
+    return [(name,factory(*[params[p] for p in names])) for (name,(factory,names)) in ALGORITHMS.get(mode,{}).items()]
+
+# state of pool workers, shipped once per worker process
+_worker_table : UnitTable = None
+
+def _init_worker(table : UnitTable):
+    global _worker_table
+    _worker_table = table
+
+def _run_algorithm(mode : Mode, params : tuple, index : int, path : str, dir : str, output_format : str = "wide", 
+        cache : "ResultCache" = None, key : str = None, collect : bool = False) -> Tuple[str,MetricsCollector]:
+    """ runs the index'th algorithm of `create_algorithms(mode,*params)` on the worker's unit table, 
+        or on units streamed from the input file if there is none, and saves the schedule, returns the file name
+        and the metrics collected during the simulation if asked for, None otherwise.
+        The schedule is also stored under the key if a cache is given """ 
+    (f,a) = create_algorithms(mode,*params)[index]
+    collector = MetricsCollector() if collect else None
+    if _worker_table is None:
+        units = Reader().stream(mode,path)
+    else:
+        units = _worker_table.units()
+    file_name = f + EXTENSIONS[output_format]
+    if output_format == "long" and cache is None:
+        a.save_runs(units,os.path.join(dir,file_name),collector)
+    else:
+        schedule = _schedule(a,units,cache,key,len(_worker_table) if _worker_table is not None else None,collector)
+        schedule.save(dir,file_name,output_format)
+    return (file_name,collector)
+
+def _schedule(algorithm : SchedulingAlgorithm, units : Iterable[Unit], cache : "ResultCache" = None, key : str = None, 
+        count : int = None, collector : MetricsCollector = None) -> Schedule:
+    """ schedules the units, storing the schedule and its metrics under the key if a cache is given """
+    start = perf_counter()
+    schedule = algorithm.schedule(units,collector)
+    runtime = perf_counter() - start
+    if cache is not None:
+        cache.put(key,schedule,schedule_metrics(schedule,runtime,count))
+    return schedule
+
+def schedule_metrics(schedule : Schedule, runtime : float, units : int = None) -> Dict:
+    """ the summary metrics of a schedule which the result cache keeps next to it """
+    metrics = schedule.metrics()
+    return {
+        "units" : units if units is not None else len(schedule.units),
+        "avg turnaround time" : metrics.avg_turnaround_time,
+        "avg wait time" : metrics.avg_wait_time,
+        "avg response time" : metrics.avg_response_time,
+        "head movements" : schedule.head_movements() if isinstance(schedule,TrackSchedule) else None,
+        "runtime (s)" : runtime,
+    }
+
+LATENCY_STATS = ("mean","p50","p95","p99","max")
+LATENCY_COLUMNS = ["algorithm","priority","units","throughput","context switches"] + [
+    "{} {}".format(m,stat) for m in LATENCY_METRICS for stat in LATENCY_STATS]
+
+def latency_rows(name : str, collector : MetricsCollector) -> List[list]:
+    """ rows of the metrics collected while the named algorithm ran, one over all units followed by one per priority 
+        if the units have priorities, throughput and context switches are only counted over all units """
+    priorities = [p for p in collector.priorities() if p is not None]
+    rows = []
+    for priority in [...] + priorities:
+        latency = collector.latency(priority)
+        if priority is ...:
+            row = [name,"all",collector.completed,collector.throughput,collector.context_switches]
+        else:
+            row = [name,priority,latency["turnaround time"]["count"],"_","_"]
+        rows.append(row + [latency[m][stat] for m in LATENCY_METRICS for stat in LATENCY_STATS])
+    return rows
+
+### ------- ###
+### LIBRARY ###
+### ------- ###
+
+class RunResult():
+    def __init__(self, name : str, schedule : Schedule, metrics : Dict) -> None:
+        """ outcome of `run`, held in memory
+
+            Args:
+                name(`str`): name of the algorithm, or of its type if it was passed as an instance
+                schedule(`Schedule`): the schedule, a `TrackSchedule` for disks and a `MultiprocessorSchedule` over several cpus
+                metrics(`Dict`): its summary metrics, see `schedule_metrics`
+            
+        """
+        self.name = name
+        self.schedule = schedule
+        self.metrics = metrics
+
+    def __repr__(self) -> str:
+        return "RunResult({}, {} runs, avg turnaround time {})".format(self.name,len(self.schedule),self.metrics["avg turnaround time"])
+
+def load_units(units, mode : Mode = Mode.PROCESS) -> Iterable[Unit]:
+    """ returns the units to schedule, read from a csv file or binary trace if given its path, the views of a `UnitTable`, 
+        and anything else (e.g. a list of units) as it is """
+    if isinstance(units,(str,os.PathLike)):
+        return Reader().read_table(mode,os.fspath(units)).units()
+    if isinstance(units,UnitTable):
+        return units.units()
+    return units
+
+def run(units, algorithm, mode = Mode.PROCESS, cpus : int = None, balancing : str = "steal", 
+        period : int = DEFAULT_BALANCE_PERIOD, collector : MetricsCollector = None, **params) -> RunResult:
+    """ schedules the units in this process and returns the schedule and its metrics, without printing or writing any files, 
+        so a long running program can schedule any number of traces without starting the script for each one
+
+        e.g. `run("processes.csv","RoundRobin",quantum=2).metrics["avg wait time"]`
+
+        Args:
+            units: a list or iterator of units, a `UnitTable`, or the path of a csv file or binary trace (see `load_units`)
+            algorithm(`str` or `SchedulingAlgorithm`): the name of an algorithm of the mode (see `ALGORITHMS`), created with 
+                the parameters, or an algorithm which is used as it is. Algorithms keep their state, e.g. the head position, 
+                so an instance should only be run once
+            mode(`Mode` or `str`): the kind of units, also by name ("process" or "disk")
+            cpus(`int`): schedules over this many cpus with a `MultiprocessorSimulation` running the named algorithm on each
+            balancing(`str`): load balancing between cpus, see `MultiprocessorSimulation`
+            period(`int`): time units between periodic balancing
+            collector(`MetricsCollector`): updated with percentiles and counters while the units are scheduled, if given
+            params: parameters of the named algorithm, see `create_algorithm`
+    """
+    mode = Mode[mode.upper()] if isinstance(mode,str) else mode
+    if isinstance(algorithm,str):
+        name = algorithm
+        algorithm = create_algorithm(name,mode,**params)
+    elif params:
+        raise ValueError("parameters are only used to create algorithms by name, not {}".format(sorted(params)))
+    else:
+        name = type(algorithm).__name__
+    if cpus is not None:
+        if name not in ALGORITHMS.get(mode,{}):
+            raise ValueError("scheduling over several cpus needs the name of the algorithm, to create one for each cpu")
+        algorithm = MultiprocessorSimulation(lambda: create_algorithm(name,mode,**params),cpus,balancing,period)
+
+    units = load_units(units,mode)
+    start = perf_counter()
+    schedule = algorithm.schedule(units,collector)
+    runtime = perf_counter() - start
+    return RunResult(name,schedule,schedule_metrics(schedule,runtime))
+
+def run_all(units, mode = Mode.PROCESS, **params) -> Dict[str,RunResult]:
+    """ runs every algorithm of the mode like `run`, over units which are read once, returns the results by algorithm name. 
+        Each algorithm takes the parameters it needs (see `create_algorithm`) """
+    mode = Mode[mode.upper()] if isinstance(mode,str) else mode
+    units = load_units(units,mode)
+    if not isinstance(units,Sequence):
+        units = list(units)
+    return {name : run(units,name,mode,**params) for name in ALGORITHMS.get(mode,{})}
+
+### ------- ###
+### BATCH   ###
+### ------- ###
+
+SUMMARY_COLUMNS = ["file","algorithm","parameters","units","avg turnaround time","avg wait time","head movements","runtime (s)"]
+
+def is_batch_path(path : str) -> bool:
+    """ whether the path names a directory or a glob pattern of input files rather than a single file """
+    return os.path.isdir(path) or any(c in path for c in "*?[")
+
+def batch_files(path : str) -> List[str]:
+    """ returns the csv files in the given directory, or those matching the given glob pattern, in sorted order """
+    if os.path.isdir(path):
+        return sorted(glob(os.path.join(path,"*.csv")))
+    return sorted(f for f in glob(path) if os.path.isfile(f))
+
+def describe_params(mode : Mode, params : tuple) -> str:
+    (quantum,head_min,head_max,head_init,head_dir,mlfq_policy,nstep) = params
+    if mode == Mode.PROCESS:
+        return "quantum={} mlfq={}".format(quantum,mlfq_policy)
+    return "low={} high={} head={} direction={} nstep={}".format(head_min,head_max,head_init,head_dir,nstep)
+
+@lru_cache(maxsize=1)
+def _load_table(mode : Mode, path : str, size : int, mtime_ns : int) -> UnitTable:
+    # jobs on the same file are handed out together, so keeping the last file around avoids re-parsing it per algorithm.
+    # The size and modification time are part of the key, so a file changed between batches is read again
+    return Reader().read_table(mode,path)
+
+def _run_batch_job(mode : Mode, params : tuple, index : int, path : str, gantt_dir : str, output_format : str = "wide", 
+        cache : "ResultCache" = None, setting : str = "") -> list:
+    """ runs the index'th algorithm of `create_algorithms(mode,*params)` on the given file, optionally saves its 
+        schedule to the gantt directory (the setting, if any, is added to its name), returns its summary row. 
+        With a cache, runs it has seen before are not repeated """
+    (f,a) = create_algorithms(mode,*params)[index]
+    # the version of the file which is hashed, loaded and simulated, a schedule is only cached if the file was the same throughout
+    stat = os.stat(path)
+    key = cache.key(cache.file_hash(path),mode.name,f,a,params) if cache is not None else None
+    # the schedule itself is only needed for the gantt charts
+    hit = None
+    if cache is not None and gantt_dir is not None:
+        hit = cache.get(key)
+    elif cache is not None:
+        metrics = cache.get_metrics(key)
+        hit = (None,metrics) if metrics is not None else None
+    if hit is not None:
+        (schedule,metrics) = hit
+    else:
+        table = _load_table(mode,path,stat.st_size,stat.st_mtime_ns)
+        start = perf_counter()
+        schedule = a.schedule(table.units())
+        metrics = schedule_metrics(schedule,perf_counter() - start,len(table))
+        if cache is not None and _same_file(stat,os.stat(path)):
+            cache.put(key,schedule,metrics)
+
+    if gantt_dir is not None:
+        schedule.save(gantt_dir,"{}_{}{}{}".format(os.path.splitext(os.path.basename(path))[0],f,setting,EXTENSIONS[output_format]),output_format)
+
+    head_movements = metrics["head movements"] if metrics["head movements"] is not None else "_"
+    return [path,f,describe_params(mode,params),metrics["units"],metrics["avg turnaround time"],metrics["avg wait time"],
+        head_movements,"{:.6f}".format(metrics["runtime (s)"])]
+
+def _same_file(before : os.stat_result, after : os.stat_result) -> bool:
+    """ whether the file was not changed between the two stats of it """
+    return (before.st_size,before.st_mtime_ns) == (after.st_size,after.st_mtime_ns)
+
+def run_batch(mode : Mode, params : tuple, path : str, summary_path : str, gantt_dir : str = None, jobs : int = 1, output_format : str = "wide",
+        cache : "ResultCache" = None, quanta : List[int] = None, mlfq_policies : List[str] = None) -> int:
+    """ runs every algorithm on every input file matched by the path, writes one summary row per run to the summary file,
+        returns the number of runs. Runs found in the cache, if given, are not repeated.
+        Given quanta and MLFQ policies, the process algorithms are run for every quantum, and the feedback queue for every
+        quantum and policy, on every file, instead of only with the quantum and policy of the parameters """
+    files = batch_files(path)
+    quanta = quanta or [params[0]]
+    mlfq_policies = mlfq_policies or [params[5]]
+    grid = len(quanta) > 1 or len(mlfq_policies) > 1
+
+    # (params, algorithm index, gantt file name setting) of every run on a file
+    runs = []
+    for q in quanta:
+        for policy in mlfq_policies:
+            point = (q,) + params[1:5] + (policy,) + params[6:]
+            for (i,(_,a)) in enumerate(create_algorithms(mode,*point)):
+                mlfq = isinstance(a,MultilevelFeedbackQueue)
+                if not mlfq and policy != mlfq_policies[0]:
+                    # only the feedback queue depends on the policy
+                    continue
+                setting = ("_q{}_{}".format(q,policy) if mlfq else "_q{}".format(q)) if grid else ""
+                runs.append((point,i,setting))
+    n = len(runs)
+    batch = [(mode,point,i,f,gantt_dir,output_format,cache,setting) for f in files for (point,i,setting) in runs]
+
+    if gantt_dir is not None:
+        os.makedirs(gantt_dir,exist_ok=True)
+
+    if jobs > 1 and len(batch) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            rows = list(pool.map(_run_batch_job,*zip(*batch),chunksize=n))
+    else:
+        rows = [_run_batch_job(*b) for b in batch]
+    if cache is not None:
+        # each worker only knows the entries it put itself, trim what they put together
+        cache.evict()
+
+    save_summary(summary_path,SUMMARY_COLUMNS,rows)
+    return len(rows)
+
+### ------- ###
+### SWEEP   ###
+### ------- ###
+
+def parse_quanta(spec : str) -> List[int]:
+    """ parses a comma separated list of quanta and inclusive start:end[:step] ranges, e.g. "1:4,8,16:64:16" """
+    quanta = []
+    for part in spec.split(","):
+        bounds = [int(x) for x in part.split(":")]
+        if len(bounds) == 1:
+            quanta.append(bounds[0])
+        else:
+            step = bounds[2] if len(bounds) > 2 else 1
+            quanta.extend(range(bounds[0],bounds[1] + 1,step))
+    return quanta
+
+def _sweep_key(name : str, algorithm : SchedulingAlgorithm, quantum : int, mlfq_policy : str, max_burst : int) -> tuple:
+    """ key identifying the simulation an algorithm in a sweep performs, points with equal keys produce identical schedules """
+    if isinstance(algorithm,MultilevelFeedbackQueue):
+        if mlfq_policy in MLFQ_QUANTUM_FREE_POLICIES:
+            return (name,mlfq_policy)
+        return (name,mlfq_policy,quantum)
+    if isinstance(algorithm,(RoundRobin,MultipleQueuesFlipOnHighPreempt,MultipleQueuesFreezeOnHighPreempt)):
+        # no process is ever preempted by its quantum expiring once it covers the longest burst
+        return (name,min(quantum,max_burst))
+    return (name,)
+
+def _run_sweep_job(mode : Mode, params : tuple, index : int) -> list:
+    """ runs the index'th algorithm of `create_algorithms(mode,*params)` on the worker's unit table, 
+        returns the average turnaround time, average wait time and runtime """
+    (_,a) = create_algorithms(mode,*params)[index]
+
+    start = perf_counter()
+    schedule = a.schedule(_worker_table.units())
+    runtime = perf_counter() - start
+
+    metrics = schedule.metrics()
+    return [metrics.avg_turnaround_time,metrics.avg_wait_time,runtime]
+
+def run_sweep(mode : Mode, params : tuple, path : str, quanta : List[int], mlfq_policies : List[str], summary_path : str, jobs : int = 1) -> int:
+    """ runs every algorithm for every quantum and MLFQ policy on the input file, which is parsed once, 
+        and writes one summary row per point and algorithm, returns the number of rows """
+    table = Reader().read_table(mode,path)
+    max_burst = max(table.base["cpu_time"],default=1)
+
+    # grid of (params, algorithm index, key), simulations with the same key are only run once
+    grid = []
+    unique = {}
+    for q in quanta:
+        for policy in mlfq_policies:
+            point = (q,) + params[1:5] + (policy,) + params[6:]
+            for (i,(f,a)) in enumerate(create_algorithms(mode,*point)):
+                mlfq = isinstance(a,MultilevelFeedbackQueue)
+                if not mlfq and policy != mlfq_policies[0]:
+                    # only the feedback queue depends on the policy
+                    continue
+                key = _sweep_key(f,a,q,policy,max_burst)
+                unique.setdefault(key,(point,i))
+                setting = "quantum={} mlfq={}".format(q,policy) if mlfq else "quantum={}".format(q)
+                grid.append((setting,f,key))
+
+    keys = list(unique)
+    _init_worker(table)
+    if jobs > 1 and len(keys) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs,initializer=_init_worker,initargs=(table,)) as pool:
+            results = list(pool.map(_run_sweep_job,[mode] * len(keys),*zip(*[unique[k] for k in keys])))
+    else:
+        results = [_run_sweep_job(mode,*unique[k]) for k in keys]
+    results = dict(zip(keys,results))
+
+    rows = []
+    for (setting,f,key) in grid:
+        (avg_turnaround_time,avg_wait_time,runtime) = results[key]
+        rows.append([path,f,setting,len(table),avg_turnaround_time,avg_wait_time,"_","{:.6f}".format(runtime)])
+
+    save_summary(summary_path,SUMMARY_COLUMNS,rows)
+    return len(rows)
+
+### ------- ###
+### PAGE    ###
+### ------- ###
+
+PAGE_COLUMNS = ["file","algorithm","frames","references","hits","faults","fault rate","runtime (s)"]
+
+# reference string of pool workers in page mode
+_worker_references : Sequence[int] = None
+
+def _init_page_worker(references : Sequence[int]):
+    global _worker_references
+    _worker_references = references
+
+def _run_page_job(index : int, frames : int, path : str) -> list:
+    """ runs the index'th algorithm of `create_page_algorithms()` with the given number of frames on the worker's 
+        reference string, or on the one streamed from the input file if there is none, returns its summary row """
+    (f,a) = create_page_algorithms()[index]
+    references = _worker_references
+    if references is None:
+        reader = Reader()
+        references = reader.read_references(path) if a.needs_sequence else reader.references(path)
+
+    start = perf_counter()
+    result = a.simulate(references,frames)
+    runtime = perf_counter() - start
+    return [path,f,frames,result.references,result.hits,result.faults,result.fault_rate,"{:.6f}".format(runtime)]
+
+def _run_curve_job(index : int, frame_counts : List[int], path : str) -> List[list]:
+    """ finds the faults of the index'th algorithm of `create_page_algorithms()`, a stack algorithm, for every number 
+        of frames in one pass over the reference string, returns a summary row per number of frames """
+    (f,a) = create_page_algorithms()[index]
+    references = _worker_references
+    if references is None:
+        reader = Reader()
+        references = reader.read_references(path) if a.needs_sequence else reader.references(path)
+
+    start = perf_counter()
+    curve = a.fault_curve(references,max(frame_counts))
+    runtime = perf_counter() - start
+    rows = []
+    for frames in frame_counts:
+        result = curve.at(frames)
+        rows.append([path,f,frames,result.references,result.hits,result.faults,result.fault_rate,"{:.6f}".format(runtime)])
+    return rows
+
+def run_paging(path : str, frame_counts : List[int], out_path : str, stream : bool = False, jobs : int = 1, curve : bool = False) -> int:
+    """ runs every page replacement algorithm for every number of frames over the reference string in the file, 
+        writes the hit and fault counts of each run to the output file, returns the number of runs.
+        Unless streaming, the reference string is parsed once and shared by all runs, otherwise it is read lazily 
+        by every run of the algorithms which can work on it in one pass.
+        With `curve` only the stack algorithms are run, once each, giving the faults of every number of frames at once 
+        (the runtime of every row is then that of the whole pass) """
+    if any(f < 1 for f in frame_counts):
+        raise ValueError("the number of frames must be at least 1")
+    references = None if stream else Reader().read_references(path)
+    algorithms = create_page_algorithms()
+    if curve:
+        job = _run_curve_job
+        runs = [(i,frame_counts,path) for (i,(_,a)) in enumerate(algorithms) if a.stack_algorithm]
+    else:
+        job = _run_page_job
+        runs = [(i,f,path) for i in range(len(algorithms)) for f in frame_counts]
+
+    if jobs > 1 and len(runs) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs,initializer=_init_page_worker,initargs=(references,)) as pool:
+            results = list(pool.map(job,*zip(*runs)))
+    else:
+        _init_page_worker(references)
+        results = [job(*r) for r in runs]
+    rows = [row for rows in results for row in rows] if curve else results
+
+    save_summary(out_path,PAGE_COLUMNS,rows)
+    return len(rows)
+
+def _pop_flag(argv : List[str], flag : str, default = None):
+    """ removes the flag and the value following it from the arguments, returns the value """
+    if flag not in argv:
+        return default
+    i = argv.index(flag)
+    if i + 1 >= len(argv):
+        print("{} must be followed by a value".format(flag))
+        sys.exit(0)
+    value = argv[i+1]
+    del argv[i:i+2]
+    return value
+
 if __name__ == "__main__":
+    # the runtime copy of the module, `ResultCache` is only imported for annotations above
+    from common import cache as result_cache
+    from common.profiling import Profiler
+    import cProfile
+    import json
     
     path = None
     mode = None
+    jobs = 1
+    stream = False
+
+    # pull out optional flags, leaving the positional arguments
+    argv = sys.argv.copy()
+    if "--stream" in argv:
+        stream = True
+        argv.remove("--stream")
+    profile = "--profile" in argv
+    if profile:
+        argv.remove("--profile")
     try:
-        path = sys.argv[1]
-        mode = sys.argv[2] 
+        jobs = int(_pop_flag(argv,"--jobs",1))
+    except ValueError:
+        print("--jobs must be followed by the number of worker processes")
+        sys.exit(0)
+    summary_path = _pop_flag(argv,"--summary","summary.csv")
+    sweep = _pop_flag(argv,"--sweep")
+    mlfq_policies = _pop_flag(argv,"--mlfq")
+    gantt_dir = _pop_flag(argv,"--gantt")
+    profile_json = _pop_flag(argv,"--profile-json")
+    cprofile_path = _pop_flag(argv,"--cprofile")
+    curve = "--curve" in argv
+    output_format = _pop_flag(argv,"--format","wide")
+    convert_path = _pop_flag(argv,"--convert")
+    latency_path = _pop_flag(argv,"--latency")
+    no_cache = "--no-cache" in argv
+    if no_cache:
+        argv.remove("--no-cache")
+    cache_dir = _pop_flag(argv,"--cache-dir")
+    try:
+        cache_size = int(float(_pop_flag(argv,"--cache-size",result_cache.DEFAULT_CACHE_SIZE >> 20)) * (1 << 20))
+    except ValueError:
+        print("--cache-size must be followed by the size limit of the cache in MB")
+        sys.exit(0)
+    if curve:
+        argv.remove("--curve")
+    try:
+        cpus = int(_pop_flag(argv,"--cpus",0))
+        (balancing,balance_period) = parse_balancing(_pop_flag(argv,"--balance","steal"))
+    except ValueError:
+        print("--cpus must be followed by the number of cpus, and --balance by one of {} and optionally :PERIOD".format(BALANCING))
+        sys.exit(0)
+    try:
+        nstep = int(_pop_flag(argv,"--nstep",DEFAULT_NSTEP))
+        if nstep < 1:
+            raise ValueError()
+    except ValueError:
+        print("--nstep must be followed by the number of requests per batch of N-step SCAN, at least 1")
+        sys.exit(0)
+
+    try:
+        path = argv[1]
+        mode = argv[2] 
     except Exception:
         pass 
 
@@ -379,58 +1505,230 @@ if __name__ == "__main__":
     head_min = 0
     head_max = 199
     head_dir = 1
+    frames = "3"
     if mode == "process":
-        if len(sys.argv) == 4:
-            quantum = int(sys.argv[3])
+        if len(argv) == 4:
+            quantum = int(argv[3])
     elif mode == "disk":
         try:
-            head_min = int(sys.argv[3])
-            head_max = int(sys.argv[4])
-            head_init = int(sys.argv[5])
-            head_dir = int((sys.argv[6]))
+            head_min = int(argv[3])
+            head_max = int(argv[4])
+            head_init = int(argv[5])
+            head_dir = int((argv[6]))
         except:
             print("usage: python3 script.py input.csv disk low-track high-track head-initial-pos head-initial-direction (+ is towards high)")
             sys.exit(0)
+    elif mode == "page":
+        if len(argv) == 4:
+            frames = argv[3]
             
     vals = ["process","disk","page"] # corresponds to Mode enum indexes
     
     if mode not in vals or not path or not mode:
-        print("first argument must be the path to the csv file containing scheduling units")
+        print("first argument must be the path to the csv file containing scheduling units, or a directory or glob pattern of such files to run in batch")
         print("second argument must be one of: {}".format(vals))
         print("third argument can be either ommitted or set to the time quantum for rr (default 1)")
+        print("in page mode the third argument is the number of frames, or a list of them in the same format as --sweep (default 3), "
+            + "--curve finds the faults of the stack algorithms (LRU, OPT) for all of them in a single pass")
+        print("--jobs N anywhere in the arguments runs the algorithms over N worker processes")
+        print("--stream anywhere in the arguments reads units lazily as they arrive instead of loading the file up front, the file must be sorted by arrival time")
+        print("--profile prints counters and per phase times of every algorithm, --profile-json FILE saves them as json, "
+            + "--cprofile FILE saves cProfile stats of the runs, profiling runs the algorithms serially")
+        print("--mlfq POLICY picks the quantum policy of the multilevel feedback queue, one of: {} (default exponential)".format(list(MLFQ_POLICIES)))
+        print("--sweep QUANTA runs the process algorithms for every quantum in a list of values and start:end[:step] ranges (e.g. 1:8,16), "
+            + "and every policy in a comma separated --mlfq list (default all), writing one summary table")
+        print("--format FORMAT saves schedules as one of: {}, a gantt chart with a column per run (the default), a row per run ".format(FORMATS)
+            + "which is written as the simulation goes, a compact binary file which can be loaded back with common.output.load_schedule, "
+            + "or a gantt chart (a head movement plot for disks) drawn as an svg image or an html page, which stays the same size however long the schedule")
+        print("--convert FILE saves the input as a binary trace to FILE instead of scheduling it, binary traces can be used in place of csv files and load without parsing")
+        print("schedules are cached by the content of the input file, the algorithm and its parameters so repeated runs are not simulated again, "
+            + "--no-cache bypasses the cache, --cache-dir DIR moves it (default ~/.cache/os-scripts) and --cache-size MB limits its size (default {}), ".format(result_cache.DEFAULT_CACHE_SIZE >> 20)
+            + "evicting the least recently used schedules")
+        print("in disk mode, --nstep N sets the number of requests per batch of N-step SCAN (default {})".format(DEFAULT_NSTEP))
+        print("--cpus N schedules processes over N cpus, each running the algorithm on its own ready queue, processes with a cpu in their "
+            + "optional fifth field are pinned to it. --balance KIND[:PERIOD] moves waiting processes between cpus, one of {}: ".format(BALANCING)
+            + "idle cpus steal work (the default), work is evened out every PERIOD time units (default {}), both or neither".format(DEFAULT_BALANCE_PERIOD))
+        print("--latency FILE collects the 50th, 95th and 99th percentile turnaround, wait and response times of every algorithm, over all "
+            + "units and per priority, with its throughput and context switches while it runs and saves them to FILE, in bounded memory however long the trace")
+        print("--sweep also works in batch, running every quantum and policy on every file")
+        print("in batch and sweep, --summary FILE sets where the summary of all runs is written (default summary.csv), --gantt DIR additionally saves every schedule to DIR")
         print("the input file needs to be a csv file with each line corresponding to a scheduling unit, in one of the following formats:")
         sys.exit(0)
     else:
         reader = Reader()
         eMode = Mode(vals.index(mode))
-        units = reader.read(eMode,path)    
-
-        alg_filenames: List[Tuple[str,SchedulingAlgorithm]] = []
-
-        if eMode == Mode.PROCESS:
-            alg_filenames  = [
-                ("FirstComeFirstServed", NonPreemptiveFCFS()),
-                ("ShortestJobFirst", NonPreemptiveSJF()),
-                ("ShortestRemainingTimeFirst", PreEmptiveSJF()),
-                ("RoundRobin", RoundRobin(quantum)),
-                ("Priority",  Priority()),
-                ("MultipleQueuesFlipOnHighPreempt", MultipleQueuesFlipOnHighPreempt(quantum)),
-                ("MultipleQueuesFreezeOnHighPreempt", MultipleQueuesFreezeOnHighPreempt(quantum)),
-                ("MultiLevelFeedbackQueue",  MultilevelFeedbackQueue(lambda p : 2 **(p-1)))
-            ]
-        elif eMode == Mode.DISK: 
-            alg_filenames = [
-                ("FirstComeFirstServed", FCFSDisk(head_min,head_max,head_init,head_dir)),
-                ("ShortestSeekTimeFirst", ShortestSeekTimeFirst(head_min,head_max,head_init,head_dir)),
-                ("SCAN", SCAN(head_min,head_max,head_init,head_dir)),
-                ("C-SCAN", CSCAN(head_min,head_max,head_init,head_dir))
-            ]
-        elif eMode == Mode.PAGE: 
-            pass
+
+        try:
+            policies = mlfq_policies.split(",") if mlfq_policies else list(MLFQ_POLICIES) if sweep else ["exponential"]
+            quanta = parse_quanta(sweep) if sweep else [quantum]
+        except ValueError:
+            print("could not parse the --sweep quanta")
+            sys.exit(0)
+        if output_format not in FORMATS:
+            print("--format must be one of {}".format(FORMATS))
+            sys.exit(0)
+        if any(p not in MLFQ_POLICIES for p in policies) or (len(policies) > 1 and not sweep):
+            print("--mlfq must name one of {}, or a comma separated list of them when sweeping".format(list(MLFQ_POLICIES)))
+            sys.exit(0)
+
+        if latency_path and (eMode == Mode.PAGE or sweep or cpus or is_batch_path(path)):
+            print("--latency works on a single process or disk scheduling file")
+            sys.exit(0)
+
+        if convert_path:
+            if eMode == Mode.PAGE or is_batch_path(path):
+                print("--convert works on a single process or disk scheduling file")
+                sys.exit(0)
+            try:
+                units = reader.convert(eMode,path,convert_path)
+            except ValueError as e:
+                print(e)
+                sys.exit(1)
+            print("Saved binary trace of {} units to {}".format(units,convert_path))
+            sys.exit(0)
+
+        if eMode == Mode.PAGE:
+            if is_batch_path(path):
+                print("page mode works on a single reference string file")
+                sys.exit(0)
+            try:
+                frame_counts = parse_quanta(frames)
+            except ValueError:
+                print("could not parse the number of frames")
+                sys.exit(0)
+            out_path = os.path.join(os.path.dirname(path),"page_faults.csv")
+            try:
+                runs = run_paging(path,frame_counts,out_path,stream,jobs,curve)
+            except ValueError as e:
+                print(e)
+                sys.exit(1)
+            print("Saved hit and fault counts of {} runs to {}".format(runs,out_path))
+            sys.exit(0)
+
+        params = (quantum,head_min,head_max,head_init,head_dir,policies[0],nstep)
+        alg_filenames = create_algorithms(eMode,*params)
+        out_dir = os.path.dirname(path)
+
+        if sweep:
+            if eMode != Mode.PROCESS:
+                print("--sweep works on process scheduling files")
+                sys.exit(0)
+            try:
+                if is_batch_path(path):
+                    cache = None if no_cache else result_cache.ResultCache(cache_dir,cache_size)
+                    rows = run_batch(eMode,params,path,summary_path,gantt_dir,jobs,output_format,cache,quanta,policies)
+                else:
+                    rows = run_sweep(eMode,params,path,quanta,policies,summary_path,jobs)
+            except ValueError as e:
+                print(e)
+                sys.exit(1)
+            print("Saved summary of {} settings to {}".format(rows,summary_path))
+            sys.exit(0)
+
+        if cpus:
+            if eMode != Mode.PROCESS or is_batch_path(path) or output_format == "binary":
+                print("--cpus works on a single process scheduling file, saved in any format but binary")
+                sys.exit(0)
+            try:
+                migrations = run_multiprocessor(eMode,params,path,out_dir,cpus,balancing,balance_period,output_format)
+            except ValueError as e:
+                print(e)
+                sys.exit(1)
+            print("Saved scheduling data of {} cpus to {}, {} processes were moved between cpus".format(cpus,out_dir,migrations))
+            sys.exit(0)
+
+        if is_batch_path(path):
+            try:
+                cache = None if no_cache else result_cache.ResultCache(cache_dir,cache_size)
+                runs = run_batch(eMode,params,path,summary_path,gantt_dir,jobs,output_format,cache)
+            except ValueError as e:
+                print(e)
+                sys.exit(1)
+            print("Saved summary of {} runs to {}".format(runs,summary_path))
+            sys.exit(0)
     
-        for (f,a) in alg_filenames:
-            uCopy = deepcopy(units)
-            schedule = a.schedule(uCopy)
-            schedule.save(os.path.dirname(path),"{}.csv".format(f))
+        try:
+            profiler = Profiler() if profile or profile_json else None
+            cprofiler = cProfile.Profile() if cprofile_path else None
+
+            # profiling and collecting metrics always simulate, and rows per run in the long format are written as the simulation goes, never holding a schedule to cache
+            cache = None
+            if not (no_cache or profiler or cprofiler or latency_path or output_format == "long"):
+                cache = result_cache.ResultCache(cache_dir,cache_size)
+
+            # (algorithm index, cache key) of every algorithm which needs simulating, cached schedules are saved straight away
+            pending = []
+            file_hash = cache.file_hash(path) if cache else None
+            for (i,(f,a)) in enumerate(alg_filenames):
+                key = cache.key(file_hash,eMode.name,f,a,params) if cache else None
+                if cache is None:
+                    pending.append((i,key))
+                elif output_format == "binary":
+                    # cached schedules are already in the binary format
+                    if not cache.copy_schedule(key,os.path.join(out_dir,f + EXTENSIONS[output_format])):
+                        pending.append((i,key))
+                else:
+                    hit = cache.get(key)
+                    if hit is not None:
+                        hit[0].save(out_dir,f + EXTENSIONS[output_format],output_format)
+                    else:
+                        pending.append((i,key))
+
+            table = None if stream or not pending else reader.read_table(eMode,path)    
+
+            if jobs > 1 and len(pending) > 1 and not profiler and not cprofiler:
+                # the unit table is shipped to each worker once as flat arrays (or units are streamed by each worker), 
+                # every algorithm writes its own file
+                from concurrent.futures import ProcessPoolExecutor
+                with ProcessPoolExecutor(max_workers=jobs,initializer=_init_worker,initargs=(table,)) as pool:
+                    results = list(pool.map(_run_algorithm,
+                        [eMode] * len(pending),
+                        [params] * len(pending),
+                        [i for (i,_) in pending],
+                        [path] * len(pending),
+                        [out_dir] * len(pending),
+                        [output_format] * len(pending),
+                        [cache] * len(pending),
+                        [key for (_,key) in pending],
+                        [bool(latency_path)] * len(pending)))
+                collectors = [(alg_filenames[i][0],c) for ((i,_),(_,c)) in zip(pending,results)]
+            else:
+                if cprofiler:
+                    cprofiler.enable()
+
+                collectors = []
+                for (i,key) in pending:
+                    (f,a) = alg_filenames[i]
+                    collector = MetricsCollector() if latency_path else None
+                    if collector is not None:
+                        collectors.append((f,collector))
+                    algorithm_profile = profiler.instrument(f,a) if profiler else None
+                    if stream:
+                        units = reader.stream(eMode,path)
+                    else:
+                        units = table.units()
+                    if output_format == "long" and not profiler and not cache:
+                        # rows are written as the runs end, the schedule is never held in memory
+                        a.save_runs(units,os.path.join(out_dir,f + EXTENSIONS[output_format]),collector)
+                        continue
+                    schedule = _schedule(a,units,cache,key,len(table) if table is not None else None,collector)
+                    with profiler.time(algorithm_profile,"save") if profiler else nullcontext():
+                        schedule.save(out_dir,f + EXTENSIONS[output_format],output_format)
+
+                if cprofiler:
+                    cprofiler.disable()
+                    cprofiler.dump_stats(cprofile_path)
+                if profile:
+                    print(profiler.summary())
+                if profile_json:
+                    with open(profile_json,"w") as pf:
+                        json.dump(profiler.to_dict(),pf,indent=1)
+
+            if latency_path:
+                save_summary(latency_path,LATENCY_COLUMNS,[row for (f,c) in collectors for row in latency_rows(f,c)])
+                print("Saved latency percentiles of {} algorithms to {}".format(len(collectors),latency_path))
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
 
         print("Saved scheduling data to {}".format(os.path.dirname(path)))
\ No newline at end of file
@@ -0,0 +1,535 @@
+import csv
+import functools
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import scheduling
+from common.input import Mode
+from common.metrics import QuantileSketch
+from common.output import load_schedule
+from common.paging import LRU, OPT
+from common.units import Process, Track
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+### ------- ###
+### REFERENCE ###
+### ------- ###
+
+# a per-tick simulator with the policies written out plainly over lists, as the schedules were first computed,
+# which the event-driven engine has to reproduce tick for tick
+
+class Job():
+    def __init__(self, unit):
+        self.name = unit.name
+        self.arrival_time = unit.arrival_time
+        self.left = getattr(unit,"cpu_time",1)
+        self.priority = getattr(unit,"priority",None)
+        self.track = getattr(unit,"track_number",None)
+
+def edge(track):
+    return Job(Track(0,str(track),track))
+
+def committed(key):
+    """ keeps running its first choice, the least by key in ready order, until it finishes """
+    state = {"last" : None}
+    def choose(ready):
+        if state["last"] is None or state["last"].left <= 0:
+            state["last"] = min(ready,key=key)
+        return state["last"]
+    return choose
+
+class ReferenceRoundRobin():
+    def __init__(self, quantum, on_preempt=None):
+        self.quantum = quantum
+        self.left = quantum
+        self.current = None
+        self.on_preempt = on_preempt
+
+    def reset(self):
+        self.current = None
+        self.left = self.quantum
+
+    def __call__(self, ready):
+        if self.current is not None and self.current.left <= 0:
+            self.current = None
+        if self.current is None:
+            self.current = ready[0]
+            self.left = self.quantum
+        chosen = self.current
+        if self.left - 1 <= 0:
+            if self.on_preempt:
+                self.on_preempt(chosen)
+            ready.remove(chosen)
+            ready.append(chosen)
+            self.current = None
+        self.left -= 1
+        return chosen
+
+def multiple_queues(quantum_of, flip=False, feedback=False):
+    """ round robin over the best priority present, with a queue per priority """
+    state = {"queues" : {}, "last" : None, "last_priority" : None, "preempted" : None}
+    def preempt(job):
+        state["preempted"] = job
+    def choose(ready):
+        ready.sort(key=lambda j: j.priority)
+        best = ready[0].priority
+        queues = state["queues"]
+        if best not in queues:
+            queues[best] = ReferenceRoundRobin(quantum_of(best),preempt if feedback else None)
+        last = state["last"]
+        if flip and state["last_priority"] and best < state["last_priority"] and last is not None and last.left > 0:
+            ready.remove(last)
+            ready.append(last)
+            ready.sort(key=lambda j: j.priority)
+            queues[state["last_priority"]].reset()
+        level = [j for j in ready if j.priority == best]
+        state["preempted"] = None
+        chosen = queues[best](level)
+        ready[:len(level)] = level
+        preempted = state["preempted"]
+        if preempted is not None:
+            preempted.priority += 1
+            ready.sort(key=lambda j: j.priority if j is not preempted else float("inf"))
+            queues[best].reset()
+        state["last"] = chosen
+        state["last_priority"] = best
+        return chosen
+    return choose
+
+def scan(low, high, head, direction, circular=False):
+    state = {"head" : head, "direction" : direction, "servicing" : True}
+    def choose(ready):
+        d = state["direction"]
+        if not state["servicing"]:
+            state["servicing"] = True
+            state["head"] = high if d == -1 else low
+            return edge(state["head"])
+        ahead = [j for j in ready if (j.track - state["head"]) * d >= 0]
+        if not ahead:
+            if circular:
+                state["servicing"] = False
+            else:
+                state["direction"] *= -1
+            state["head"] = low if d == -1 else high
+            return edge(state["head"])
+        chosen = min(ahead,key=lambda j: abs(j.track - state["head"]))
+        state["head"] = chosen.track
+        return chosen
+    return choose
+
+def sstf(head):
+    state = {"head" : head}
+    def choose(ready):
+        chosen = min(ready,key=lambda j: abs(j.track - state["head"]))
+        state["head"] = chosen.track
+        return chosen
+    return choose
+
+def reference_policies(quantum, low, high, head, direction):
+    return {
+        Mode.PROCESS : {
+            "FirstComeFirstServed" : committed(lambda j: j.arrival_time),
+            "ShortestJobFirst" : committed(lambda j: j.left),
+            "ShortestRemainingTimeFirst" : lambda ready: min(ready,key=lambda j: j.left),
+            "RoundRobin" : ReferenceRoundRobin(quantum),
+            "Priority" : committed(lambda j: j.priority),
+            "MultipleQueuesFlipOnHighPreempt" : multiple_queues(lambda p: quantum,flip=True),
+            "MultipleQueuesFreezeOnHighPreempt" : multiple_queues(lambda p: quantum),
+            "MultiLevelFeedbackQueue" : multiple_queues(lambda p: 2 ** (p - 1),feedback=True),
+        },
+        Mode.DISK : {
+            "FirstComeFirstServed" : lambda ready: ready[0],
+            "ShortestSeekTimeFirst" : sstf(head),
+            "SCAN" : scan(low,high,head,direction),
+            "C-SCAN" : scan(low,high,head,direction,circular=True),
+        },
+    }
+
+def reference_ticks(choose, units):
+    """ the name of the unit run at every busy tick, stepping one tick at a time """
+    arriving = [Job(u) for u in units]
+    ready = []
+    ticks = {}
+    time = 0
+    while arriving or ready:
+        ready.extend(j for j in arriving if j.arrival_time <= time)
+        arriving = [j for j in arriving if j.arrival_time > time]
+        if ready:
+            chosen = choose(ready)
+            ticks[time] = chosen.name
+            chosen.left -= 1
+            if chosen.left <= 0 and chosen in ready:
+                ready.remove(chosen)
+        time += 1
+    return ticks
+
+def engine_ticks(runs):
+    return {t : str(u) for (start,end,u) in runs for t in range(start,end + 1)}
+
+def random_processes(rng, count):
+    # idle gaps between bursts of arrivals, listed out of arrival order
+    units = []
+    time = 0
+    for i in range(count):
+        time += rng.choice((0,0,1,rng.randint(2,20)))
+        units.append(Process(time,"p{}".format(i),rng.randint(1,8),rng.randint(0,3)))
+    rng.shuffle(units)
+    return units
+
+def random_tracks(rng, count):
+    units = [Track(rng.choice((0,rng.randint(0,30))),"t{}".format(i),rng.choice((rng.randint(0,199),50))) for i in range(count)]
+    rng.shuffle(units)
+    return units
+
+class ReferenceTest(unittest.TestCase):
+    def test_engine_matches_per_tick_reference(self):
+        rng = random.Random(7)
+        for trial in range(60):
+            quantum = rng.randint(1,4)
+            head = rng.randint(0,199)
+            direction = rng.choice((1,-1))
+            traces = {Mode.PROCESS : random_processes(rng,rng.randint(1,15)),Mode.DISK : random_tracks(rng,rng.randint(1,15))}
+            reference = reference_policies(quantum,0,199,head,direction)
+            for mode in (Mode.PROCESS,Mode.DISK):
+                algorithms = dict(scheduling.create_algorithms(mode,quantum,0,199,head,direction))
+                for (name,choose) in reference[mode].items():
+                    with self.subTest(trial=trial,mode=mode.name,algorithm=name):
+                        runs = algorithms[name].simulate(traces[mode])
+                        self.assertEqual(engine_ticks(runs),reference_ticks(choose,traces[mode]))
+
+def run_names(runs):
+    # edge tracks are created afresh by every run, so runs are compared by name
+    return [(a,b,str(u)) for (a,b,u) in runs]
+
+def traces(rng):
+    return {Mode.PROCESS : random_processes(rng,rng.randint(1,20)),Mode.DISK : random_tracks(rng,rng.randint(1,20))}
+
+class OnlineTest(unittest.TestCase):
+    def test_feed_and_online_match_simulate(self):
+        rng = random.Random(11)
+        for trial in range(20):
+            for (mode,units) in traces(rng).items():
+                arrived = sorted(units,key=lambda u: u.arrival_time)
+                for (name,a) in scheduling.create_algorithms(mode,2,0,199,53,1):
+                    with self.subTest(trial=trial,mode=mode.name,algorithm=name):
+                        expected = run_names(a.simulate(units))
+                        algorithm = dict(scheduling.create_algorithms(mode,2,0,199,53,1))[name]
+                        self.assertEqual(run_names(algorithm.feed(iter(arrived))),expected)
+
+                        # units submitted in arrival order while time is moved on in uneven steps
+                        simulation = dict(scheduling.create_algorithms(mode,2,0,199,53,1))[name].online()
+                        runs = []
+                        for u in arrived:
+                            runs.extend(simulation.advance(rng.randint(simulation.time,u.arrival_time)))
+                            runs.extend(simulation.advance(u.arrival_time))
+                            simulation.submit(u)
+                        runs.extend(simulation.advance(float("inf")))
+                        runs.extend(simulation.finish())
+                        self.assertEqual(run_names(runs),expected)
+
+    def test_submit_in_the_past(self):
+        simulation = scheduling.RoundRobin(1).online()
+        simulation.submit(Process(0,"a",3,0))
+        simulation.advance(2)
+        with self.assertRaises(ValueError):
+            simulation.submit(Process(1,"b",1,0))
+
+class BinaryTest(unittest.TestCase):
+    def test_round_trip(self):
+        rng = random.Random(5)
+        with tempfile.TemporaryDirectory() as d:
+            for (mode,units) in traces(rng).items():
+                for (name,a) in scheduling.create_algorithms(mode,2,0,199,53,-1):
+                    with self.subTest(mode=mode.name,algorithm=name):
+                        schedule = a.schedule(units)
+                        path = os.path.join(d,"{}_{}.bin".format(mode.name,name))
+                        schedule.save_binary(path)
+                        loaded = load_schedule(path)
+                        self.assertIs(type(loaded),type(schedule))
+                        self.assertEqual(run_names(loaded.runs()),run_names(schedule.runs()))
+                        fields = lambda s: [(u.name,u.arrival_time,getattr(u,"cpu_time",None),getattr(u,"priority",None),
+                            getattr(u,"track_number",None),getattr(u,"edge",None)) for u in s.units]
+                        self.assertEqual(fields(loaded),fields(schedule))
+                        self.assertEqual(loaded.metrics().avg_turnaround_time,schedule.metrics().avg_turnaround_time)
+                        if mode == Mode.DISK:
+                            self.assertEqual(loaded.start.track_number,53)
+                            self.assertEqual(loaded.head_movements(),schedule.head_movements())
+
+def nearest_rank(ordered, p):
+    return ordered[max(0,int(-(-p * len(ordered) // 100)) - 1)]
+
+class QuantileSketchTest(unittest.TestCase):
+    def test_error_bound(self):
+        rng = random.Random(3)
+        percentiles = (0,1,10,25,50,75,90,95,99,99.9,100)
+        for trial in range(20):
+            values = [int(rng.expovariate(1 / rng.choice((10,1000,10**6)))) for _ in range(rng.randint(1,2000))]
+            sketch = QuantileSketch()
+            halves = (QuantileSketch(),QuantileSketch())
+            for (i,v) in enumerate(values):
+                sketch.add(v)
+                halves[i % 2].add(v)
+            merged = halves[0].merge(halves[1])
+            ordered = sorted(values)
+            for p in percentiles:
+                with self.subTest(trial=trial,p=p):
+                    exact = nearest_rank(ordered,p)
+                    estimate = sketch.quantile(p)
+                    if exact < 128:
+                        self.assertEqual(estimate,exact)
+                    else:
+                        self.assertLessEqual(abs(estimate - exact),exact / 64)
+                    self.assertEqual(merged.quantile(p),estimate)
+            self.assertEqual(sketch.summary()["max"],ordered[-1])
+            self.assertEqual(merged.count,len(values))
+
+def random_pinned_processes(rng, count, cpus):
+    # some processes pinned to a cpu, arrivals crowded enough that cpus run out of work and queue up in turn
+    units = [Process(rng.randint(0,count * 2),"p{}".format(i),rng.randint(1,12),rng.randint(1,4),
+        rng.randrange(cpus) if rng.random() < 0.2 else None) for i in range(count)]
+    rng.shuffle(units)
+    return units
+
+def overlapping(spans):
+    spans = sorted(spans)
+    return any(b[0] <= a[1] for (a,b) in zip(spans,spans[1:]))
+
+class MultiprocessorTest(unittest.TestCase):
+    def test_single_cpu_matches_the_policy(self):
+        rng = random.Random(17)
+        for trial in range(30):
+            units = random_processes(rng,rng.randint(1,25))
+            for (name,a) in scheduling.create_algorithms(Mode.PROCESS,1 + trial % 3):
+                expected = a.simulate(units)
+                for balancing in scheduling.BALANCING:
+                    with self.subTest(trial=trial,algorithm=name,balancing=balancing):
+                        policy = lambda: dict(scheduling.create_algorithms(Mode.PROCESS,1 + trial % 3))[name]
+                        runs = scheduling.MultiprocessorSimulation(policy,1,balancing,1 + trial % 5).simulate(units)
+                        self.assertEqual([(a,b,u) for (a,b,u,_) in runs],expected)
+
+    def test_schedules_are_valid(self):
+        rng = random.Random(19)
+        migrations = dict.fromkeys(scheduling.BALANCING,0)
+        for trial in range(30):
+            cpus = rng.randint(2,6)
+            units = random_pinned_processes(rng,rng.randint(1,50),cpus)
+            for (name,_) in scheduling.create_algorithms(Mode.PROCESS):
+                for balancing in scheduling.BALANCING:
+                    with self.subTest(trial=trial,algorithm=name,balancing=balancing):
+                        policy = lambda: dict(scheduling.create_algorithms(Mode.PROCESS,1 + trial % 3))[name]
+                        simulation = scheduling.MultiprocessorSimulation(policy,cpus,balancing,1 + trial % 5)
+                        runs = simulation.simulate(units)
+                        migrations[balancing] += simulation.migrations
+                        work = {}
+                        per_cpu = {}
+                        per_unit = {}
+                        for (a,b,u,cpu) in runs:
+                            self.assertGreaterEqual(a,u.arrival_time)
+                            if u.affinity is not None:
+                                self.assertEqual(cpu,u.affinity)
+                            work[u] = work.get(u,0) + b - a + 1
+                            per_cpu.setdefault(cpu,[]).append((a,b))
+                            per_unit.setdefault(u,[]).append((a,b))
+                        # every process gets exactly its burst, no cpu runs two at once and no process runs on two cpus at once
+                        self.assertEqual(work,{u : u.cpu_time for u in units})
+                        self.assertFalse(any(overlapping(spans) for spans in per_cpu.values()))
+                        self.assertFalse(any(overlapping(spans) for spans in per_unit.values()))
+        # every kind of balancing but none moved processes
+        self.assertEqual([b for (b,n) in migrations.items() if n == 0],["none"])
+
+def random_references(rng, length, pages):
+    # mostly a drifting working set, with jumps anywhere
+    references = []
+    base = 0
+    for _ in range(length):
+        if rng.random() < 0.1:
+            base = rng.randrange(pages)
+        references.append((base + rng.randrange(4)) % pages if rng.random() < 0.8 else rng.randrange(pages))
+    return references
+
+def fewest_faults(references, frames):
+    """ the fewest faults of any eviction choices, found by trying them all """
+    @functools.lru_cache(maxsize=None)
+    def faults(i, resident):
+        if i == len(references):
+            return 0
+        page = references[i]
+        if page in resident:
+            return faults(i + 1,resident)
+        if len(resident) < frames:
+            return 1 + faults(i + 1,resident | {page})
+        return 1 + min(faults(i + 1,(resident - {victim}) | {page}) for victim in resident)
+    return faults(0,frozenset())
+
+class PagingTest(unittest.TestCase):
+    def test_fault_curves_match_simulation(self):
+        rng = random.Random(23)
+        for trial in range(40):
+            references = random_references(rng,rng.randint(0,300),rng.randint(1,20))
+            max_frames = rng.randint(1,25)
+            for algorithm in (LRU(),OPT()):
+                curve = algorithm.fault_curve(references,max_frames)
+                for frames in range(1,max_frames + 1):
+                    with self.subTest(trial=trial,algorithm=type(algorithm).__name__,frames=frames):
+                        self.assertEqual(curve.faults(frames),algorithm.simulate(references,frames).faults)
+
+    def test_opt_is_optimal(self):
+        rng = random.Random(29)
+        for trial in range(60):
+            pages = rng.randint(1,6)
+            references = [rng.randrange(pages) for _ in range(rng.randint(0,14))]
+            for frames in range(1,5):
+                with self.subTest(references=references,frames=frames):
+                    self.assertEqual(OPT().simulate(references,frames).faults,fewest_faults(references,frames))
+
+class LibraryTest(unittest.TestCase):
+    def test_unused_parameters_are_ignored(self):
+        processes = os.path.join(HERE,"processes.csv")
+        self.assertEqual(run_names(scheduling.run(processes,"FirstComeFirstServed",quantum=2).schedule.runs()),
+            run_names(scheduling.run(processes,"FirstComeFirstServed").schedule.runs()))
+        self.assertIsInstance(scheduling.create_algorithm("SCAN",Mode.DISK,quantum=3,nstep=4),scheduling.SCAN)
+        results = scheduling.run_all(os.path.join(HERE,"tracks.csv"),Mode.DISK,head_init=53,nstep=2)
+        self.assertEqual(set(results),set(scheduling.ALGORITHMS[Mode.DISK]))
+
+    def test_unknown_parameters(self):
+        with self.assertRaises(ValueError):
+            scheduling.create_algorithm("RoundRobin",quantom=2)
+        with self.assertRaises(ValueError):
+            scheduling.run(os.path.join(HERE,"processes.csv"),"RoundRobin",quantom=2)
+        with self.assertRaises(ValueError):
+            scheduling.create_algorithm("FirstComeFirstServed",mlfq_policy="cubic")
+
+class NStepSCANTest(unittest.TestCase):
+    def test_rejects_empty_batches(self):
+        for n in (0,-1):
+            with self.assertRaises(ValueError):
+                scheduling.NStepSCAN(0,199,53,1,n)
+            with self.assertRaises(ValueError):
+                scheduling.run(os.path.join(HERE,"tracks.csv"),"N-Step-SCAN",Mode.DISK,nstep=n)
+
+    def test_flag_rejects_empty_batches(self):
+        for n in ("0","-1"):
+            result = subprocess.run([sys.executable,os.path.join(HERE,"scheduling.py"),os.path.join(HERE,"tracks.csv"),
+                "disk","0","199","53","1","--nstep",n,"--no-cache"],capture_output=True,text=True,timeout=30)
+            self.assertIn("--nstep must be followed by",result.stdout)
+
+def write_processes(path, count, mtime_ns):
+    """ writes a trace of count processes, with a given modification time so rewrites are always noticed """
+    with open(path,"w") as f:
+        f.write("".join("p{},0,{},1\n".format(i,i + 1) for i in range(count)))
+    os.utime(path,ns=(mtime_ns,mtime_ns))
+
+def summary_units(path):
+    with open(path) as f:
+        return {int(row["units"]) for row in csv.DictReader(f)}
+
+class BatchTest(unittest.TestCase):
+    def test_rewritten_file_is_read_again(self):
+        with tempfile.TemporaryDirectory() as d:
+            trace = os.path.join(d,"trace.csv")
+            summary = os.path.join(d,"summary.out")
+            params = (1,0,199,0,1,"exponential",scheduling.DEFAULT_NSTEP)
+            write_processes(trace,1,10**18)
+            scheduling.run_batch(Mode.PROCESS,params,trace,summary)
+            self.assertEqual(summary_units(summary),{1})
+            write_processes(trace,2,2 * 10**18)
+            scheduling.run_batch(Mode.PROCESS,params,trace,summary)
+            self.assertEqual(summary_units(summary),{2})
+
+    def test_cache_holds_rewritten_file(self):
+        from common.cache import ResultCache
+        with tempfile.TemporaryDirectory() as d:
+            trace = os.path.join(d,"trace.csv")
+            summary = os.path.join(d,"summary.out")
+            cache_dir = os.path.join(d,"cache")
+            params = (1,0,199,0,1,"exponential",scheduling.DEFAULT_NSTEP)
+            write_processes(trace,1,10**18)
+            scheduling.run_batch(Mode.PROCESS,params,trace,summary,cache=ResultCache(cache_dir))
+            self.assertEqual(summary_units(summary),{1})
+            write_processes(trace,2,2 * 10**18)
+            scheduling.run_batch(Mode.PROCESS,params,trace,summary,cache=ResultCache(cache_dir))
+            self.assertEqual(summary_units(summary),{2})
+            # served from the cache, without a table left over in this process
+            scheduling._load_table.cache_clear()
+            scheduling.run_batch(Mode.PROCESS,params,trace,summary,cache=ResultCache(cache_dir))
+            self.assertEqual(summary_units(summary),{2})
+
+    def test_grid_over_files(self):
+        with tempfile.TemporaryDirectory() as d:
+            for name in ("a.csv","b.csv"):
+                write_processes(os.path.join(d,name),3,10**18)
+            summary = os.path.join(d,"summary.out")
+            params = (1,0,199,0,1,"exponential",scheduling.DEFAULT_NSTEP)
+            runs = scheduling.run_batch(Mode.PROCESS,params,d,summary,quanta=[1,2],mlfq_policies=["exponential","linear"])
+            # every algorithm per quantum, and the feedback queue once more per quantum for the second policy
+            self.assertEqual(runs,2 * 2 * (len(scheduling.ALGORITHMS[Mode.PROCESS]) + 1))
+
+class ResultCacheTest(unittest.TestCase):
+    def test_lists_the_cache_only_when_over_the_limit(self):
+        from unittest import mock
+        from common.cache import ResultCache
+        schedule = scheduling.run(os.path.join(HERE,"processes.csv"),"RoundRobin").schedule
+        with tempfile.TemporaryDirectory() as d:
+            cache = ResultCache(d,1 << 20)
+            with mock.patch("os.scandir",wraps=os.scandir) as scandir:
+                for i in range(20):
+                    cache.put(str(i),schedule,{})
+            self.assertEqual(scandir.call_count,1)
+
+            # a small limit still evicts the oldest entries
+            cache = ResultCache(d,3 * os.path.getsize(os.path.join(d,"0.bin")))
+            for i in range(20,25):
+                cache.put(str(i),schedule,{})
+            self.assertLessEqual(len([f for f in os.listdir(d) if f.endswith(".bin")]),3)
+            self.assertIsNone(cache.get_metrics("0"))
+
+    def test_concurrent_hashes_are_kept(self):
+        import json
+        from unittest import mock
+        from common.cache import ResultCache
+        with tempfile.TemporaryDirectory() as d:
+            (first,second) = (os.path.join(d,"a.csv"),os.path.join(d,"b.csv"))
+            write_processes(first,1,10**18)
+            write_processes(second,2,10**18)
+            cache_dir = os.path.join(d,"cache")
+            (ours,theirs) = (ResultCache(cache_dir),ResultCache(cache_dir))
+            digest = ResultCache._digest
+            def interleaved(path):
+                # another worker remembers a file while the first one is being hashed
+                if path == first:
+                    theirs.file_hash(second)
+                return digest(path)
+            with mock.patch.object(ResultCache,"_digest",side_effect=interleaved):
+                ours.file_hash(first)
+            with open(os.path.join(cache_dir,"hashes.json")) as f:
+                index = json.load(f)
+            self.assertEqual(set(index),{os.path.realpath(first),os.path.realpath(second)})
+            self.assertEqual([f for f in os.listdir(cache_dir) if f.endswith(".tmp")],[])
+
+    def test_unwritable_cache_is_skipped(self):
+        import contextlib
+        import io
+        from common.cache import ResultCache
+        with tempfile.TemporaryDirectory() as d:
+            # a file where the cache directory should be
+            blocked = os.path.join(d,"blocked")
+            open(blocked,"w").close()
+            trace = os.path.join(d,"trace.csv")
+            summary = os.path.join(d,"summary.out")
+            write_processes(trace,2,10**18)
+            cache = ResultCache(os.path.join(blocked,"cache"))
+            errors = io.StringIO()
+            with contextlib.redirect_stderr(errors):
+                runs = scheduling.run_batch(Mode.PROCESS,(1,0,199,0,1,"exponential",scheduling.DEFAULT_NSTEP),trace,summary,cache=cache)
+            self.assertEqual(runs,len(scheduling.ALGORITHMS[Mode.PROCESS]))
+            self.assertEqual(summary_units(summary),{2})
+            self.assertTrue(cache.disabled)
+            self.assertEqual(errors.getvalue().count("not using the result cache"),1)
+
+if __name__ == "__main__":
+    unittest.main()